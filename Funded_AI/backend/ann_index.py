@@ -0,0 +1,143 @@
+import json
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from backend.config import CHROMA_DIR
+from backend.rag_cache import as_unit_rows
+
+logger = logging.getLogger(__name__)
+
+hnswlib = None
+
+try:
+    import hnswlib  # Shipped with chromadb as chroma-hnswlib
+except Exception as e:
+    logger.warning(f"hnswlib unavailable, falling back to Chroma queries: {e}")
+
+ANN_INDEX_FILE = "ann_index.bin"
+ANN_IDS_FILE = "ann_ids.json"
+
+# Sidecar layout; older sidecars (ids only) are rebuilt
+SIDECAR_VERSION = 2
+
+# HNSW graph parameters
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+
+_index = None
+_ids: List[str] = []
+# Chunk texts and metadata by label, so queries never go back to Chroma
+_docs: List[str] = []
+_metas: List[Dict] = []
+_loaded = False
+_lock = threading.Lock()
+
+
+# ===============================
+# Persistence
+# ===============================
+def _paths() -> Tuple[str, str]:
+    return (
+        os.path.join(CHROMA_DIR, ANN_INDEX_FILE),
+        os.path.join(CHROMA_DIR, ANN_IDS_FILE),
+    )
+
+
+def _load():
+    """Load the persisted index and sidecar into memory (once)."""
+    global _index, _ids, _docs, _metas, _loaded
+    _loaded = True
+
+    index_path, ids_path = _paths()
+    if hnswlib is None or not (os.path.exists(index_path) and os.path.exists(ids_path)):
+        return
+
+    try:
+        with open(ids_path, "r") as f:
+            meta = json.load(f)
+        if meta.get("version") != SIDECAR_VERSION:
+            logger.info("ANN sidecar is from an older version, index will be rebuilt")
+            return
+        index = hnswlib.Index(space="cosine", dim=meta["dim"])
+        index.load_index(index_path, max_elements=len(meta["ids"]))
+        index.set_ef(HNSW_EF_SEARCH)
+        _index, _ids, _docs, _metas = index, meta["ids"], meta["documents"], meta["metadatas"]
+        logger.info(f"Loaded ANN index with {len(_ids)} vectors")
+    except Exception as e:
+        logger.warning(f"Failed to load ANN index: {e}")
+        _index, _ids, _docs, _metas = None, [], [], []
+
+
+def available() -> bool:
+    """Load the persisted index if needed and report whether it is usable."""
+    with _lock:
+        if not _loaded:
+            _load()
+        return _index is not None
+
+
+# ===============================
+# Public API
+# ===============================
+def build_index(
+    ids: List[str],
+    embeddings: Sequence[Sequence[float]],
+    documents: List[str],
+    metadatas: List[Dict],
+):
+    """Build the ANN index from Chroma-stored chunks and persist it."""
+    global _index, _ids, _docs, _metas, _loaded
+
+    if hnswlib is None or not ids:
+        return
+
+    vectors = as_unit_rows(embeddings)
+    dim = vectors.shape[1]
+    index = hnswlib.Index(space="cosine", dim=dim)
+    index.init_index(max_elements=len(ids), M=HNSW_M, ef_construction=HNSW_EF_CONSTRUCTION)
+    index.add_items(vectors, list(range(len(ids))))
+    index.set_ef(HNSW_EF_SEARCH)
+
+    index_path, ids_path = _paths()
+    index.save_index(index_path)
+    with open(ids_path, "w") as f:
+        json.dump({
+            "version": SIDECAR_VERSION,
+            "dim": dim,
+            "ids": list(ids),
+            "documents": list(documents),
+            "metadatas": list(metadatas),
+        }, f)
+
+    with _lock:
+        _index, _ids, _docs, _metas, _loaded = (
+            index, list(ids), list(documents), list(metadatas), True
+        )
+    logger.info(f"Built ANN index with {len(ids)} vectors")
+
+
+def search(vector: Sequence[float], k: int) -> Optional[Dict[str, List[List]]]:
+    """Top-k cosine search, returning results shaped like ``col.query`` output.
+
+    Returns None when no usable index is loaded so the caller can fall
+    back to Chroma.
+    """
+    with _lock:
+        if not _loaded:
+            _load()
+        index, docs, metas = _index, _docs, _metas
+
+    if index is None or not docs or len(vector) != index.dim:
+        return None
+
+    k = min(k, len(docs))
+    labels, distances = index.knn_query(as_unit_rows(vector), k=k)
+    labels = labels[0]
+    return {
+        "documents": [[docs[label] for label in labels]],
+        "distances": [distances[0].tolist()],
+        "metadatas": [[metas[label] for label in labels]],
+    }
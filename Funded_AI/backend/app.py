@@ -1,30 +1,36 @@
+import asyncio
+import json
 import logging
 import os
+import re
+import time
 from contextlib import asynccontextmanager
-from typing import List, Dict
+from typing import Annotated, AsyncIterator, List, Dict, Optional, Tuple
 
 from fastapi import FastAPI, HTTPException, Request, Header
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from pydantic import BaseModel, field_validator
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-import chromadb
-
-from backend.rag import answer, ensure_index, get_quick_info_cards
+from fastapi.responses import FileResponse, StreamingResponse
+from pydantic import BaseModel, Field, StringConstraints, field_validator
+
+from backend.rag import answer, answer_stream, ensure_index, get_quick_info_cards, get_chroma_client
+from backend.llm import warm_embeddings
 from backend.config import (
     MAX_HISTORY,
     MAX_QUESTION_LENGTH,
-    CHROMA_DIR,
     ALLOWED_ORIGINS,
     RATE_LIMIT,
     ADMIN_TOKEN,
     INJECTION_PATTERNS,
+    WARMUP_QUESTIONS,
+    WARMUP_TIMEOUT,
+    PITCH_CACHE_TTL,
     validate_config,
 )
 from backend.router import default_router
+from backend.ratelimit import TokenBucketMiddleware
+from backend import semantic_cache
+from backend.dispatchers.base import load_marketing_prompt
 
 # ===============================
 # Logging Configuration
@@ -45,7 +51,11 @@ FRONTEND_DIR = os.path.join(BASE_DIR, "frontend")
 # ===============================
 # Rate Limiter
 # ===============================
-limiter = Limiter(key_func=get_remote_address)
+# Paths covered by the token-bucket middleware
+RATE_LIMITED_PATHS = ["/chat", "/chat/stream", "/cards"]
+
+# Fixed prompt used for investor-style pitch requests
+PITCH_QUESTION = "Give a concise startup pitch explaining FundEd, its problem, solution, product, and value."
 
 
 # ===============================
@@ -54,8 +64,6 @@ limiter = Limiter(key_func=get_remote_address)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan: startup and shutdown events."""
-    import asyncio
-    
     # Startup
     logger.info("Application starting up...")
     
@@ -66,6 +74,9 @@ async def lifespan(app: FastAPI):
         logger.critical(f"Configuration validation failed: {e}")
         raise
     
+    # Shared Chroma client for readiness probes and the indexer
+    app.state.chroma = get_chroma_client()
+    
     # Delay indexing to allow network to stabilize on Railway
     logger.info("Waiting 10s for network stabilization before indexing...")
     await asyncio.sleep(10)
@@ -78,10 +89,31 @@ async def lifespan(app: FastAPI):
         logger.info("Index can be built later via POST /reload endpoint")
         # Don't crash - app is still usable, just needs manual reload
     
+    # Warm-up is best-effort; run it in the background so a slow or
+    # unavailable OpenAI never delays accepting traffic
+    warmup = asyncio.create_task(_warm_up())
+    
     yield
     
     # Shutdown
     logger.info("Application shutting down...")
+    warmup.cancel()
+
+
+async def _warm_up():
+    """Pre-warm the query embedding cache, then precompute the pitch."""
+    try:
+        warmed = await asyncio.wait_for(
+            warm_embeddings(WARMUP_QUESTIONS + [PITCH_QUESTION]),
+            timeout=WARMUP_TIMEOUT,
+        )
+        logger.info(f"Embedding cache warmed with {warmed} queries")
+    except asyncio.TimeoutError:
+        logger.warning(f"Embedding warm-up timed out after {WARMUP_TIMEOUT}s")
+    
+    # Precompute the fixed pitch so pitch requests skip the LLM; until it
+    # lands, pitch requests generate it on demand
+    await _refresh_pitch()
 
 
 # ===============================
@@ -94,9 +126,12 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
-# Add rate limiter
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+# Rate limiter (added before CORS so CORS stays outermost and 429s keep CORS headers)
+app.add_middleware(
+    TokenBucketMiddleware,
+    rate_limit=RATE_LIMIT,
+    paths=RATE_LIMITED_PATHS,
+)
 
 # CORS middleware
 app.add_middleware(
@@ -111,44 +146,47 @@ app.add_middleware(
 # ===============================
 # Input Validation
 # ===============================
+# All patterns compiled into one case-insensitive alternation at import
+_INJ_RE = re.compile(
+    "|".join(re.escape(p) for p in INJECTION_PATTERNS),
+    re.IGNORECASE,
+)
+
+
 def check_prompt_injection(text: str) -> bool:
     """Check if text contains potential prompt injection patterns."""
-    lower = text.lower()
-    for pattern in INJECTION_PATTERNS:
-        if pattern in lower:
-            return True
-    return False
+    return _INJ_RE.search(text) is not None
+
+
+_WS_RE = re.compile(r"\s+")
 
 
 def sanitize_input(text: str) -> str:
     """Sanitize user input."""
-    # Remove excessive whitespace
-    text = " ".join(text.split())
-    return text.strip()
+    # Collapse runs of whitespace in a single pass
+    return _WS_RE.sub(" ", text).strip()
 
 
 # ===============================
 # Request Models
 # ===============================
+# Strip and length checks run inside pydantic-core, not in Python validators
+Question = Annotated[
+    str,
+    StringConstraints(strip_whitespace=True, min_length=1, max_length=MAX_QUESTION_LENGTH),
+]
+
+
 class ChatRequest(BaseModel):
-    question: str
-    history: List[Dict[str, str]] = []
-    
-    @field_validator("question")
-    @classmethod
-    def validate_question(cls, v: str) -> str:
-        v = v.strip()
-        if not v:
-            raise ValueError("Question cannot be empty")
-        if len(v) > MAX_QUESTION_LENGTH:
-            raise ValueError(f"Question too long. Maximum {MAX_QUESTION_LENGTH} characters.")
-        return v
+    question: Question
+    history: List[Dict[str, str]] = Field(default_factory=list)
     
     @field_validator("history")
     @classmethod
     def validate_history(cls, v: List[Dict[str, str]]) -> List[Dict[str, str]]:
-        if len(v) > MAX_HISTORY * 2:
-            v = v[-(MAX_HISTORY * 2):]  # type: ignore[index]
+        # Truncate once here; chat() uses the validated history as-is
+        if len(v) > MAX_HISTORY:
+            v = v[-MAX_HISTORY:]  # type: ignore[index]
         return v
 
 
@@ -162,13 +200,13 @@ def health():
 
 
 @app.get("/ready")
-def readiness():
+def readiness(request: Request):
     """Readiness probe - check dependencies."""
     errors = []
     
-    # Check ChromaDB connectivity
+    # Check ChromaDB connectivity on the shared client
     try:
-        client = chromadb.PersistentClient(path=CHROMA_DIR)
+        client = getattr(request.app.state, "chroma", None) or get_chroma_client()
         client.heartbeat()
     except Exception as e:
         errors.append(f"ChromaDB: {str(e)}")
@@ -195,60 +233,162 @@ def root():
 # ===============================
 # Chat Endpoint
 # ===============================
-@app.post("/chat")
-@limiter.limit(RATE_LIMIT)
-def chat(request: Request, req: ChatRequest):
-    """Main chat endpoint with rate limiting."""
+def _validate_chat_request(req: ChatRequest) -> Tuple[str, List[Dict[str, str]]]:
+    """Sanitize the question and reject prompt injection attempts."""
     question = sanitize_input(req.question)
     
     # Check for prompt injection
     if check_prompt_injection(question):
-        logger.warning(f"Potential prompt injection detected: {question[:100]}...")  # type: ignore[index]
+        logger.warning("Potential prompt injection detected: %.100s...", question)
         raise HTTPException(
             status_code=400,
             detail="Invalid input detected"
         )
     
-    # Also check history for injections
-    for msg in req.history:
-        content = msg.get("content", "")
-        if check_prompt_injection(content):
-            logger.warning("Prompt injection detected in history")
-            raise HTTPException(
-                status_code=400,
-                detail="Invalid input detected in conversation history"
-            )
+    # Also check history for injections (each distinct message once, stop at first hit)
+    contents = {msg.get("content", "") for msg in req.history}
+    if any(check_prompt_injection(content) for content in contents):
+        logger.warning("Prompt injection detected in history")
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid input detected in conversation history"
+        )
     
-    history = req.history[-MAX_HISTORY:] if req.history else []  # type: ignore[index]
+    return question, req.history
+
+
+# ===============================
+# Pitch Cache
+# ===============================
+# The pitch prompt is fixed, so its answer is generated once and reused
+# as (response, expires_at) on app.state until PITCH_CACHE_TTL elapses.
+def _cached_pitch() -> Optional[str]:
+    cached = getattr(app.state, "pitch", None)
+    if cached and cached[1] > time.monotonic():
+        return cached[0]
+    return None
+
+
+def _store_pitch(response: str):
+    if response:
+        app.state.pitch = (response, time.monotonic() + PITCH_CACHE_TTL)
+
+
+async def _refresh_pitch():
+    """Regenerate the cached pitch (startup and /reload)."""
+    app.state.pitch = None
+    try:
+        _store_pitch(await answer(question=PITCH_QUESTION, history=[]))
+        logger.info("Pitch response cached")
+    except Exception as e:
+        logger.warning(f"Pitch precompute failed, will generate on demand: {e}")
+
+
+async def _pitch_answer(question: str, history: List[Dict[str, str]]) -> str:
+    """Auto pitch mode (investor-style explanation); ignores the question."""
+    cached = _cached_pitch()
+    if cached is not None:
+        return cached
+    response = await answer(question=PITCH_QUESTION, history=[])
+    _store_pitch(response)
+    return response
+
+
+async def _pitch_stream(question: str, history: List[Dict[str, str]]) -> AsyncIterator[str]:
+    cached = _cached_pitch()
+    if cached is not None:
+        yield cached
+        return
+    
+    parts = []
+    async for chunk in answer_stream(PITCH_QUESTION, []):
+        parts.append(chunk)
+        yield chunk
+    _store_pitch("".join(parts))
+
+
+# (intent, depth) -> handler; anything not listed falls through to RAG QA
+_ROUTES = {
+    ("about", "pitch"): _pitch_answer,
+    ("auto_pitch", "pitch"): _pitch_answer,
+}
+
+_STREAM_ROUTES = {
+    ("about", "pitch"): _pitch_stream,
+    ("auto_pitch", "pitch"): _pitch_stream,
+}
+
+
+@app.post("/chat")
+async def chat(request: Request, req: ChatRequest):
+    """Main chat endpoint with rate limiting."""
+    question, history = _validate_chat_request(req)
     
-    logger.info(f"Chat request received: {question[:50]}...")  # type: ignore[index]
+    logger.info("Chat request received: %.50s...", question)
     
     route = default_router(question, history) or {}
-    intent = route.get("intent")
-    depth = route.get("depth")
     
     # Fully handled responses (e.g. greetings)
     if route.get("handled"):
         return {"response": route.get("response", "")}
     
-    # Auto pitch mode (investor-style explanation)
-    if intent in ["about", "auto_pitch"] and depth == "pitch":
-        return {
-            "response": answer(
-                question="Give a concise startup pitch explaining FundEd, its problem, solution, product, and value.",
-                history=[]
-            )
-        }
+    # Pitch routes, else standard QA (RAG-based answer)
+    handler = _ROUTES.get((route.get("intent"), route.get("depth")))
+    if handler is not None:
+        return {"response": await handler(question, history)}
+    return {"response": await answer(question, history, route=route)}
+
+
+async def _single_chunk(text: str) -> AsyncIterator[str]:
+    yield text
+
+
+# Fixed events are encoded once
+_SSE_ERROR = f"data: {json.dumps({'error': 'Failed to generate response'})}\n\n"
+_SSE_DONE = f"data: {json.dumps({'done': True})}\n\n"
+
+
+async def _sse_events(chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Wrap text chunks as Server-Sent Events, ending with a done event."""
+    try:
+        async for chunk in chunks:
+            yield f"data: {json.dumps({'token': chunk})}\n\n"
+    except Exception as e:
+        logger.error("Streaming response failed: %s", e)
+        yield _SSE_ERROR
+    yield _SSE_DONE
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: Request, req: ChatRequest):
+    """Streaming chat endpoint: tokens are sent as Server-Sent Events."""
+    question, history = _validate_chat_request(req)
+    
+    logger.info("Streaming chat request received: %.50s...", question)
+    
+    route = default_router(question, history) or {}
+    
+    if route.get("handled"):
+        chunks = _single_chunk(route.get("response", ""))
+    else:
+        handler = _STREAM_ROUTES.get((route.get("intent"), route.get("depth")))
+        if handler is not None:
+            chunks = handler(question, history)
+        else:
+            chunks = answer_stream(question, history, route=route)
     
-    # Standard QA (RAG-based answer)
-    return {"response": answer(question, history)}
+    return StreamingResponse(
+        _sse_events(chunks),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 # ===============================
 # Admin Endpoints
 # ===============================
 @app.post("/reload")
-def reload_docs(x_admin_token: str = Header(None, alias="X-Admin-Token")):
+async def reload_docs(x_admin_token: str = Header(None, alias="X-Admin-Token")):
     """Reload document index - protected endpoint."""
     if not ADMIN_TOKEN:
         raise HTTPException(
@@ -265,7 +405,10 @@ def reload_docs(x_admin_token: str = Header(None, alias="X-Admin-Token")):
     
     logger.info("Manual reload triggered")
     try:
-        ensure_index()
+        await asyncio.to_thread(ensure_index)
+        load_marketing_prompt.cache_clear()
+        semantic_cache.clear()
+        await _refresh_pitch()
         return {"status": "reloaded", "message": "Index rebuilt successfully"}
     except Exception as e:
         logger.error(f"Reload failed: {e}")
@@ -273,11 +416,10 @@ def reload_docs(x_admin_token: str = Header(None, alias="X-Admin-Token")):
 
 
 @app.get("/cards")
-@limiter.limit(RATE_LIMIT)
-def cards(request: Request):
+async def cards(request: Request):
     """Get quick info cards."""
     logger.info("/cards endpoint called")
-    return get_quick_info_cards()
+    return await get_quick_info_cards()
 
 
 # ===============================
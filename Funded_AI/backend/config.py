@@ -14,6 +14,8 @@ DOCS_DIR = os.getenv("DOCS_DIR", os.path.join(BASE_DIR, "data", "docs"))
 # Conversation / routing settings
 # ===============================
 MAX_HISTORY = 6
+# Token budget for the history window sent to the model (newest turns kept)
+MAX_HISTORY_TOKENS = 1500
 MAX_QUESTION_LENGTH = 2000
 MAX_CONTEXT_TOKENS = 3000
 MAX_RESPONSE_TOKENS = 1000
@@ -33,6 +35,22 @@ OPENAI_EMBED_MODEL = os.getenv("OPENAI_EMBED_MODEL", "text-embedding-3-large")
 # Timeout for OpenAI API calls in seconds
 OPENAI_TIMEOUT = int(os.getenv("OPENAI_TIMEOUT", "60"))
 
+# Pooled HTTP connections to the OpenAI API. Idle keep-alive connections
+# are held for OPENAI_KEEPALIVE_EXPIRY seconds so sparse traffic does not
+# pay a new TCP + TLS handshake per call (httpx default is 5s).
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "64"))
+# Idle keep-alive connections, capped at the pool size
+OPENAI_MAX_KEEPALIVE = min(
+    int(os.getenv("OPENAI_MAX_KEEPALIVE", "32")), OPENAI_MAX_CONNECTIONS
+)
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "60"))
+
+# Number of query embeddings kept in the in-process LRU cache
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "2048"))
+
+# Texts per embeddings request when indexing (OpenAI accepts up to 2048)
+EMBED_BATCH_SIZE = 256
+
 # ===============================
 # Embedding dimensions
 # ===============================
@@ -49,6 +67,26 @@ EXPECTED_EMBED_DIM = EMBED_DIMENSIONS.get(OPENAI_EMBED_MODEL, 1536)
 # ===============================
 MIN_SIM = 0.50
 
+# Keep all chunk embeddings in process memory and search with NumPy
+RAG_IN_MEMORY = os.getenv("RAG_IN_MEMORY", "0") == "1"
+
+# MMR diversity reranking for the in-memory search (1.0 = pure relevance, disabled)
+RAG_MMR_LAMBDA = float(os.getenv("RAG_MMR_LAMBDA", "1.0"))
+RAG_MMR_CANDIDATES = 20
+
+# Store the in-memory matrix as int8 with per-row scales (4x less memory)
+RAG_INT8 = os.getenv("RAG_INT8", "0") == "1"
+
+# Prefix each retrieved chunk with its "[SECTION]" header (needs chunk metadata)
+RAG_INCLUDE_SECTION = os.getenv("RAG_INCLUDE_SECTION", "1") == "1"
+
+# Reuse answers for near-duplicate first-turn questions (cosine similarity)
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_TTL = int(os.getenv("SEMANTIC_CACHE_TTL", "3600"))
+SEMANTIC_CACHE_SIZE = 512
+# Reuse the retrieved context for near-identical questions (any turn)
+SEMANTIC_CONTEXT_THRESHOLD = float(os.getenv("SEMANTIC_CONTEXT_THRESHOLD", "0.95"))
+
 SECTION_HEADERS = [
     "problem",
     "solution",
@@ -62,6 +100,25 @@ SECTION_HEADERS = [
     "vision"
 ]
 
+# Common questions embedded at startup so first requests skip the API.
+# Only questions that reach retrieval belong here; pitch-routed ones
+# (e.g. "investor", "how do you make money") never embed the user's text
+WARMUP_QUESTIONS = [
+    "What is FundEd?",
+    "How does FundEd work?",
+    "What problem does FundEd solve?",
+    "Who is FundEd for?",
+    "What does the FundEd platform do?",
+    "How does FundEd track impact?",
+    "What makes FundEd different?",
+]
+
+# Upper bound in seconds for the background embedding warm-up
+WARMUP_TIMEOUT = 30
+
+# Seconds a generated pitch is reused before being regenerated
+PITCH_CACHE_TTL = int(os.getenv("PITCH_CACHE_TTL", "86400"))
+
 # ===============================
 # Rate Limiting
 # ===============================
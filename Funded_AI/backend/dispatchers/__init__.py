@@ -3,18 +3,21 @@ import logging
 dispatch_en = None
 dispatch_de = None
 dispatch_ar = None
+dispatch_stream_en = None
+dispatch_stream_de = None
+dispatch_stream_ar = None
 
 try:
-    from .en import dispatch as dispatch_en
+    from .en import dispatch as dispatch_en, dispatch_stream as dispatch_stream_en
 except Exception as e:
     logging.warning(f"EN dispatcher yüklenemedi: {e}")
 
 try:
-    from .de import dispatch as dispatch_de
+    from .de import dispatch as dispatch_de, dispatch_stream as dispatch_stream_de
 except Exception as e:
     logging.warning(f"DE dispatcher yüklenemedi: {e}")
 
 try:
-    from .ar import dispatch as dispatch_ar
+    from .ar import dispatch as dispatch_ar, dispatch_stream as dispatch_stream_ar
 except Exception as e:
     logging.warning(f"AR dispatcher yüklenemedi: {e}")
\ No newline at end of file
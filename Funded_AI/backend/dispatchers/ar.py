@@ -1,51 +1,22 @@
-from typing import List, Dict, Optional
-from backend.dispatchers.base import load_marketing_prompt
-from backend.llm import marketing_chat
+from typing import AsyncIterator, List, Dict, Optional
+from backend.dispatchers.base import build_marketing_messages
+from backend.llm import marketing_chat, marketing_chat_stream
 
 
-def dispatch(
+async def dispatch(
     question: str,
     history: Optional[List[Dict[str, str]]] = None,
     context: Optional[str] = None
 ):
-    if not question or not isinstance(question, str):
-        raise ValueError("question boş veya geçersiz")
+    messages = build_marketing_messages("ar", question, history, context)
+    return await marketing_chat(messages)
 
-    history = history or []
 
-    if not isinstance(history, list):
-        raise ValueError("history list tipinde olmalı")
-
-    messages = [
-        {"role": "system", "content": load_marketing_prompt("ar")}
-    ]
-
-    # Inject retrieved context with clear instructions
-    if context:
-        messages.append(
-            {
-                "role": "system",
-                "content": (
-                    "Use the following context to answer the user's question. "
-                    "Answer based on whatever relevant information is available. "
-                    "Only say you lack information if the context contains nothing relevant.\n\n"
-                    f"Context:\n{context}"
-                )
-            }
-        )
-    else:
-        messages.append(
-            {
-                "role": "system",
-                "content": (
-                    "No specific document context was retrieved for this query. "
-                    "Answer based on your general knowledge about FundEd as an education funding platform. "
-                    "Keep your response helpful and brief."
-                )
-            }
-        )
-
-    messages.extend(history)
-    messages.append({"role": "user", "content": question})
-
-    return marketing_chat(messages)
\ No newline at end of file
+async def dispatch_stream(
+    question: str,
+    history: Optional[List[Dict[str, str]]] = None,
+    context: Optional[str] = None
+) -> AsyncIterator[str]:
+    messages = build_marketing_messages("ar", question, history, context)
+    async for token in marketing_chat_stream(messages):
+        yield token
\ No newline at end of file
@@ -1,7 +1,11 @@
 import os
-from backend.config import PROMPT_DIR
+from functools import lru_cache
+from typing import List, Dict, Optional
+from backend.config import PROMPT_DIR, MAX_HISTORY_TOKENS
+from backend.llm import trim_history
 
 
+@lru_cache(maxsize=8)
 def load_marketing_prompt(lang: str) -> str:
     if not lang or not isinstance(lang, str):
         raise ValueError("lang parametresi geçerli bir string olmalı")
@@ -26,4 +30,54 @@ def load_marketing_prompt(lang: str) -> str:
     with open(prompt_path, encoding="utf-8") as f:
         lang_prompt = f.read().strip()
 
-    return system + "\n\n" + lang_prompt
\ No newline at end of file
+    return system + "\n\n" + lang_prompt
+
+def build_marketing_messages(
+    lang: str,
+    question: str,
+    history: Optional[List[Dict[str, str]]] = None,
+    context: Optional[str] = None
+) -> List[Dict[str, str]]:
+    if not question or not isinstance(question, str):
+        raise ValueError("question boş veya geçersiz")
+
+    history = history or []
+
+    if not isinstance(history, list):
+        raise ValueError("history list tipinde olmalı")
+
+    messages = [
+        {"role": "system", "content": load_marketing_prompt(lang)}
+    ]
+
+    # Inject retrieved context with clear instructions
+    if context:
+        messages.append(
+            {
+                "role": "system",
+                "content": (
+                    "Use the following context to answer the user's question. "
+                    "Answer based on whatever relevant information is available. "
+                    "Only say you lack information if the context contains nothing relevant.\n\n"
+                    f"Context:\n{context}"
+                )
+            }
+        )
+    else:
+        # No context available - tell LLM to use general FundEd knowledge
+        messages.append(
+            {
+                "role": "system",
+                "content": (
+                    "No specific document context was retrieved for this query. "
+                    "Answer based on your general knowledge about FundEd as an education funding platform. "
+                    "Keep your response helpful and brief."
+                )
+            }
+        )
+
+    # Oldest turns are dropped first once the token budget is used up
+    messages.extend(trim_history(history, MAX_HISTORY_TOKENS))
+    messages.append({"role": "user", "content": question})
+
+    return messages
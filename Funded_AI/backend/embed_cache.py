@@ -0,0 +1,98 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from backend.config import CHROMA_DIR
+
+logger = logging.getLogger(__name__)
+
+EMBED_CACHE_FILE = "embed_cache.sqlite3"
+
+# SQLite limits the number of bound parameters per statement
+_MAX_VARS = 500
+
+_conn = None
+_lock = threading.Lock()
+
+
+# ===============================
+# Connection
+# ===============================
+def _get_conn() -> sqlite3.Connection:
+    """Get or create the cache connection singleton."""
+    global _conn
+    if _conn is None:
+        os.makedirs(CHROMA_DIR, exist_ok=True)
+        conn = sqlite3.connect(
+            os.path.join(CHROMA_DIR, EMBED_CACHE_FILE),
+            check_same_thread=False,  # Access is serialized by _lock
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS emb_cache("
+            "hash TEXT, model TEXT, dim INT, vec BLOB, "
+            "PRIMARY KEY(hash, model))"
+        )
+        conn.commit()
+        _conn = conn
+    return _conn
+
+
+def text_hash(text: str) -> str:
+    """Cache key for a piece of text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# ===============================
+# Public API
+# ===============================
+def get_many(hashes: List[str], model: str) -> Dict[str, np.ndarray]:
+    """Look up cached float32 vectors by text hash. Missing hashes are omitted."""
+    found: Dict[str, np.ndarray] = {}
+    if not hashes:
+        return found
+
+    try:
+        with _lock:
+            conn = _get_conn()
+            for start in range(0, len(hashes), _MAX_VARS):
+                batch = hashes[start:start + _MAX_VARS]  # type: ignore[index]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT hash, dim, vec FROM emb_cache WHERE model = ? AND hash IN ({placeholders})",
+                    [model, *batch],
+                ).fetchall()
+                for h, dim, vec in rows:
+                    arr = np.frombuffer(vec, dtype=np.float32)
+                    if arr.shape[0] == dim:
+                        found[h] = arr
+    except sqlite3.Error as e:
+        logger.warning(f"Embedding cache read failed: {e}")
+
+    return found
+
+
+def put_many(items: Iterable[Tuple[str, Sequence[float]]], model: str):
+    """Store (hash, vector) pairs as float32 blobs in a single transaction."""
+    rows = []
+    for h, vec in items:
+        arr = np.asarray(vec, dtype=np.float32)
+        rows.append((h, model, int(arr.shape[0]), arr.tobytes()))
+    if not rows:
+        return
+
+    try:
+        with _lock:
+            conn = _get_conn()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO emb_cache(hash, model, dim, vec) VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+    except sqlite3.Error as e:
+        logger.warning(f"Embedding cache write failed: {e}")
@@ -1,90 +1,244 @@
+import asyncio
+import hashlib
+import json
 import logging
-from typing import List, Dict
-from openai import OpenAI
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+from openai import (
+    OpenAI,
+    AsyncOpenAI,
+    APIConnectionError,
+    APITimeoutError,
+    RateLimitError,
+    InternalServerError,
+)
 from tenacity import (
     retry,
     stop_after_attempt,
     stop_after_delay,
-    wait_exponential,
+    wait_exponential_jitter,
     retry_if_exception_type,
 )
+import httpx
+import numpy as np
 import tiktoken
 
+from backend import embed_cache
 from backend.config import (
     OPENAI_API_KEY,
     OPENAI_CHAT_MODEL,
     OPENAI_EMBED_MODEL,
     OPENAI_TIMEOUT,
+    OPENAI_MAX_CONNECTIONS,
+    OPENAI_MAX_KEEPALIVE,
+    OPENAI_KEEPALIVE_EXPIRY,
     MAX_RESPONSE_TOKENS,
     EXPECTED_EMBED_DIM,
+    EMBED_CACHE_SIZE,
+    EMBED_BATCH_SIZE,
 )
 
 logger = logging.getLogger(__name__)
 
-# Initialize OpenAI client
+# Max characters per embedding input (max 8191 tokens for embedding models)
+MAX_EMBED_CHARS = 30000
+
+# Distinct texts whose token counts are memoized
+TOKEN_COUNT_CACHE_SIZE = 4096
+
+# Initialize OpenAI clients
 _client = None
+_async_client = None
+
+# One connection pool per client, reused across calls
+_HTTP_LIMITS = httpx.Limits(
+    max_connections=OPENAI_MAX_CONNECTIONS,
+    max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+    keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+)
+
+# Failed TCP/TLS connects are retried by the transport itself, before the
+# request is sent; tenacity handles everything at the API level
+HTTP_CONNECT_RETRIES = 2
 
 
 def get_openai_client() -> OpenAI:
-    """Get or create OpenAI client singleton."""
+    """Get or create OpenAI client singleton (used by the indexer)."""
     global _client
     if _client is None:
         _client = OpenAI(
             api_key=OPENAI_API_KEY,
             timeout=OPENAI_TIMEOUT,
             max_retries=0,  # We handle retries ourselves with tenacity
+            http_client=httpx.Client(
+                transport=httpx.HTTPTransport(limits=_HTTP_LIMITS, retries=HTTP_CONNECT_RETRIES),
+                timeout=OPENAI_TIMEOUT,
+            ),
         )
     return _client
 
 
+def get_async_openai_client() -> AsyncOpenAI:
+    """Get or create async OpenAI client singleton (used by request handlers)."""
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncOpenAI(
+            api_key=OPENAI_API_KEY,
+            timeout=OPENAI_TIMEOUT,
+            max_retries=0,  # We handle retries ourselves with tenacity
+            http_client=httpx.AsyncClient(
+                transport=httpx.AsyncHTTPTransport(limits=_HTTP_LIMITS, retries=HTTP_CONNECT_RETRIES),
+                timeout=OPENAI_TIMEOUT,
+            ),
+        )
+    return _async_client
+
+
 # ===============================
 # Token counting utilities
 # ===============================
-def count_tokens(text: str, model: str = OPENAI_CHAT_MODEL) -> int:
-    """Count tokens in text using tiktoken."""
+@lru_cache(maxsize=4)
+def _get_encoding(model: str):
+    """Resolve and memoize the tiktoken encoder for a model."""
     try:
-        encoding = tiktoken.encoding_for_model(model)
+        return tiktoken.encoding_for_model(model)
     except KeyError:
-        encoding = tiktoken.get_encoding("cl100k_base")
-    return len(encoding.encode(text))
+        return tiktoken.get_encoding("cl100k_base")
+
+
+@lru_cache(maxsize=TOKEN_COUNT_CACHE_SIZE)
+def count_tokens(text: str, model: str = OPENAI_CHAT_MODEL) -> int:
+    """Count tokens in text using tiktoken.
+
+    Memoized: retrieval counts the same stored chunks on every query.
+    """
+    return len(_get_encoding(model).encode_ordinary(text))
 
 
 def count_messages_tokens(messages: List[Dict[str, str]], model: str = OPENAI_CHAT_MODEL) -> int:
     """Count tokens in a list of messages."""
-    total = 0
-    for msg in messages:
-        total += count_tokens(msg.get("content", ""), model)
-        total += 4  # overhead per message
+    contents = [msg.get("content", "") for msg in messages]
+    encoded = _get_encoding(model).encode_ordinary_batch(contents)
+    total = sum(len(tokens) for tokens in encoded)
+    total += 4 * len(messages)  # overhead per message
     total += 2  # overhead for the conversation
     return total
 
 
+def trim_history(
+    history: List[Dict[str, str]],
+    max_tokens: int,
+    model: str = OPENAI_CHAT_MODEL,
+) -> List[Dict[str, str]]:
+    """Keep the newest messages whose combined size fits in max_tokens."""
+    if not history:
+        return []
+
+    contents = [msg.get("content", "") for msg in history]
+    encoded = _get_encoding(model).encode_ordinary_batch(contents)
+
+    total = 0
+    start = len(history)
+    for i in range(len(history) - 1, -1, -1):
+        total += len(encoded[i]) + 4  # overhead per message
+        if total > max_tokens:
+            break
+        start = i
+    return history[start:]
+
+
 # ===============================
 # Retry decorator for API calls
 # ===============================
+# Only transient failures are retried; auth/validation errors fail fast
+RETRYABLE_ERRORS = (
+    APIConnectionError,
+    APITimeoutError,
+    RateLimitError,
+    InternalServerError,
+)
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def _parse_duration(value: str) -> Optional[float]:
+    """Parse OpenAI reset durations such as "20ms", "1s" or "6m0s"."""
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(n) * _DURATION_UNITS[unit] for n, unit in parts)
+
+
+def _retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """Seconds the API asked us to wait before retrying, if it said."""
+    response = getattr(exc, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000.0
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+
+    # Otherwise wait for whichever exhausted quota resets
+    for kind in ("requests", "tokens"):
+        if headers.get(f"x-ratelimit-remaining-{kind}") == "0":
+            reset = headers.get(f"x-ratelimit-reset-{kind}")
+            if reset:
+                return _parse_duration(reset)
+    return None
+
+
+class wait_retry_after:
+    """Honour Retry-After / rate-limit reset hints, else use the fallback wait."""
+
+    def __init__(self, fallback, max_wait: float):
+        self.fallback = fallback
+        self.max_wait = max_wait
+
+    def __call__(self, retry_state) -> float:
+        exc = retry_state.outcome.exception() if retry_state.outcome else None
+        hint = _retry_after_seconds(exc) if exc is not None else None
+        if hint is not None and hint >= 0:
+            return min(hint, self.max_wait)
+        return self.fallback(retry_state)
+
+
 @retry(
-    stop=(stop_after_attempt(3) | stop_after_delay(90)),
-    wait=wait_exponential(multiplier=1, min=2, max=15),
-    retry=retry_if_exception_type((Exception,)),
+    stop=(stop_after_attempt(3) | stop_after_delay(30)),  # User-facing, keep tail short
+    wait=wait_retry_after(wait_exponential_jitter(initial=2, max=15), max_wait=15),
+    retry=retry_if_exception_type(RETRYABLE_ERRORS),
+    reraise=True,
     before_sleep=lambda retry_state: logger.warning(
         f"Retrying OpenAI call, attempt {retry_state.attempt_number}"
     ),
 )
-def _openai_chat_with_retry(
+async def _openai_chat_with_retry(
     model: str,
     messages: List[Dict[str, str]],
     temperature: float,
     max_tokens: int,
+    response_format: Optional[Dict[str, str]] = None,
 ) -> str:
     """Make OpenAI chat completion with retry logic."""
-    client = get_openai_client()
+    client = get_async_openai_client()
+    extra = {"response_format": response_format} if response_format else {}
     
-    response = client.chat.completions.create(
+    response = await client.chat.completions.create(
         model=model,
         messages=messages,
         temperature=temperature,
         max_tokens=max_tokens,
         timeout=OPENAI_TIMEOUT,
+        **extra,
     )
     
     if not response.choices:
@@ -98,19 +252,48 @@ def _openai_chat_with_retry(
 
 
 @retry(
-    stop=stop_after_attempt(5),  # More attempts for startup
-    wait=wait_exponential(multiplier=2, min=5, max=60),  # Longer waits
-    retry=retry_if_exception_type((Exception,)),
+    stop=(stop_after_attempt(3) | stop_after_delay(30)),
+    wait=wait_retry_after(wait_exponential_jitter(initial=2, max=15), max_wait=15),
+    retry=retry_if_exception_type(RETRYABLE_ERRORS),
+    reraise=True,
+    before_sleep=lambda retry_state: logger.warning(
+        f"Retrying OpenAI stream, attempt {retry_state.attempt_number}"
+    ),
+)
+async def _openai_chat_stream_with_retry(
+    model: str,
+    messages: List[Dict[str, str]],
+    temperature: float,
+    max_tokens: int,
+):
+    """Open a streaming chat completion. Retries cover the request, not the stream."""
+    client = get_async_openai_client()
+    
+    return await client.chat.completions.create(
+        model=model,
+        messages=messages,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        timeout=OPENAI_TIMEOUT,
+        stream=True,
+    )
+
+
+@retry(
+    stop=(stop_after_attempt(3) | stop_after_delay(30)),  # Query embeddings are user-facing
+    wait=wait_retry_after(wait_exponential_jitter(initial=2, max=15), max_wait=15),
+    retry=retry_if_exception_type(RETRYABLE_ERRORS),
+    reraise=True,
     before_sleep=lambda retry_state: logger.warning(
         f"Retrying embedding call, attempt {retry_state.attempt_number}"
     ),
 )
-def _openai_embed_with_retry(text: str) -> List[float]:
+async def _openai_embed_with_retry(text: str, model: str = OPENAI_EMBED_MODEL) -> List[float]:
     """Make OpenAI embedding request with retry logic."""
-    client = get_openai_client()
+    client = get_async_openai_client()
     
-    response = client.embeddings.create(
-        model=OPENAI_EMBED_MODEL,
+    response = await client.embeddings.create(
+        model=model,
         input=text,
         timeout=OPENAI_TIMEOUT,
     )
@@ -121,57 +304,272 @@ def _openai_embed_with_retry(text: str) -> List[float]:
     return response.data[0].embedding
 
 
+@retry(
+    stop=stop_after_attempt(5),  # More attempts for startup
+    wait=wait_retry_after(wait_exponential_jitter(initial=5, max=60), max_wait=60),  # Longer waits
+    retry=retry_if_exception_type(RETRYABLE_ERRORS),
+    reraise=True,
+    before_sleep=lambda retry_state: logger.warning(
+        f"Retrying batch embedding call, attempt {retry_state.attempt_number}"
+    ),
+)
+def _openai_embed_batch_with_retry(texts: List[str], model: str = OPENAI_EMBED_MODEL) -> List[List[float]]:
+    """Embed several texts in one OpenAI request with retry logic."""
+    client = get_openai_client()
+    
+    response = client.embeddings.create(
+        model=model,
+        input=texts,
+        timeout=OPENAI_TIMEOUT,
+    )
+    
+    if len(response.data) != len(texts):
+        raise RuntimeError(
+            f"OpenAI returned {len(response.data)} embeddings for {len(texts)} inputs"
+        )
+    
+    return [d.embedding for d in sorted(response.data, key=lambda d: d.index)]
+
+
+def _openai_embed_batch(texts: List[str], model: str = OPENAI_EMBED_MODEL) -> List[List[float]]:
+    """Embed texts in slices of EMBED_BATCH_SIZE, one request per slice."""
+    embeddings: List[List[float]] = []
+    for start in range(0, len(texts), EMBED_BATCH_SIZE):
+        batch = texts[start:start + EMBED_BATCH_SIZE]  # type: ignore[index]
+        embeddings.extend(_openai_embed_batch_with_retry(batch, model))
+    return embeddings
+
+
+# ===============================
+# Request coalescing
+# ===============================
+# key -> task for identical calls currently in flight
+_inflight: Dict[Hashable, "asyncio.Task"] = {}
+
+
+def _forget_inflight(key: Hashable, task: "asyncio.Task"):
+    _inflight.pop(key, None)
+    # Mark the outcome as retrieved even if every caller went away
+    if not task.cancelled():
+        task.exception()
+
+
+async def _coalesce(key: Hashable, factory: Callable[[], Awaitable[Any]]):
+    """Single-flight: concurrent callers with the same key share one call.
+
+    The call runs as its own task and callers await it through
+    asyncio.shield, so one disconnecting client does not cancel the
+    request for the others.
+    """
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(factory())
+        _inflight[key] = task
+        task.add_done_callback(lambda t: _forget_inflight(key, t))
+    return await asyncio.shield(task)
+
+
+def _messages_key(kind: str, messages: List[Dict[str, str]], **params) -> Tuple[str, bytes]:
+    payload = json.dumps([messages, params], sort_keys=True, ensure_ascii=False)
+    return kind, hashlib.blake2b(payload.encode(), digest_size=16).digest()
+
+
+# ===============================
+# Embedding cache
+# ===============================
+_embed_lru: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+_embed_lru_lock = threading.Lock()
+
+
+def _lru_get(key: Tuple[str, str]):
+    with _embed_lru_lock:
+        value = _embed_lru.get(key)
+        if value is not None:
+            _embed_lru.move_to_end(key)
+        return value
+
+
+def _lru_put(key: Tuple[str, str], value: np.ndarray):
+    with _embed_lru_lock:
+        _embed_lru[key] = value
+        _embed_lru.move_to_end(key)
+        if len(_embed_lru) > EMBED_CACHE_SIZE:
+            _embed_lru.popitem(last=False)
+
+
+async def _embed_cached(model: str, text: str) -> np.ndarray:
+    """Memoize embeddings per (model, text) as read-only float32 vectors.
+
+    Misses fall through to the persistent on-disk cache before calling OpenAI;
+    concurrent misses for the same text share one lookup.
+    """
+    key = (model, text)
+    cached_vec = _lru_get(key)
+    if cached_vec is not None:
+        return cached_vec
+
+    return await _coalesce(("embed",) + key, lambda: _embed_uncached(model, text))
+
+
+async def _embed_uncached(model: str, text: str) -> np.ndarray:
+    key = (model, text)
+    h = embed_cache.text_hash(text)
+    # SQLite I/O (and its lock) stays off the event loop
+    cached = await asyncio.to_thread(embed_cache.get_many, [h], model)
+    if h in cached:
+        vec = cached[h]
+    else:
+        embedding = await _openai_embed_with_retry(text, model)
+        vec = np.asarray(embedding, dtype=np.float32)
+        await asyncio.to_thread(embed_cache.put_many, [(h, vec)], model)
+
+    # Shared by every caller through the LRU, so it must not be mutated
+    vec.setflags(write=False)
+
+    _lru_put(key, vec)
+    return vec
+
+
 # ===============================
 # Public API functions
 # ===============================
-def marketing_chat(messages: List[Dict[str, str]]) -> str:
+async def marketing_chat(messages: List[Dict[str, str]]) -> str:
     """Generate marketing response using cloud model."""
     if not messages or not isinstance(messages, list):
         raise ValueError("messages must be a non-empty list")
     
-    return _openai_chat_with_retry(
+    params = dict(
         model=OPENAI_CHAT_MODEL,
-        messages=messages,
         temperature=0.4,
         max_tokens=MAX_RESPONSE_TOKENS,
     )
+    return await _coalesce(
+        _messages_key("chat", messages, **params),
+        lambda: _openai_chat_with_retry(messages=messages, **params),
+    )
 
 
-def rag_chat(messages: List[Dict[str, str]]) -> str:
+async def rag_chat(messages: List[Dict[str, str]]) -> str:
     """Generate RAG response using deterministic settings."""
     if not messages or not isinstance(messages, list):
         raise ValueError("messages must be a non-empty list")
     
-    return _openai_chat_with_retry(
+    params = dict(
         model=OPENAI_CHAT_MODEL,
-        messages=messages,
         temperature=0.1,
         max_tokens=MAX_RESPONSE_TOKENS,
     )
+    return await _coalesce(
+        _messages_key("chat", messages, **params),
+        lambda: _openai_chat_with_retry(messages=messages, **params),
+    )
+
+
+async def marketing_chat_stream(messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+    """Stream a marketing response token by token."""
+    if not messages or not isinstance(messages, list):
+        raise ValueError("messages must be a non-empty list")
+    
+    stream = await _openai_chat_stream_with_retry(
+        model=OPENAI_CHAT_MODEL,
+        messages=messages,
+        temperature=0.4,
+        max_tokens=MAX_RESPONSE_TOKENS,
+    )
+    try:
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    finally:
+        await stream.close()
 
 
-def embed(text: str) -> List[float]:
-    """Generate embedding for text."""
+def _prepare_embed_input(text: str) -> str:
+    """Validate and truncate text before embedding."""
     if not text or not isinstance(text, str):
         raise ValueError("text must be a non-empty string")
     
     # Truncate text if too long (max 8191 tokens for embedding models)
-    max_chars = 30000
-    if len(text) > max_chars:
-        text = text[:max_chars]  # type: ignore[index]
-        logger.warning(f"Truncated embedding input to {max_chars} characters")
-    
-    embedding = _openai_embed_with_retry(text)
+    if len(text) > MAX_EMBED_CHARS:
+        text = text[:MAX_EMBED_CHARS]  # type: ignore[index]
+        logger.warning("Truncated embedding input to %d characters", MAX_EMBED_CHARS)
     
+    return text
+
+
+def _check_embed_dim(embedding: Sequence[float]):
+    """Warn if the embedding does not match the configured model size."""
     if EXPECTED_EMBED_DIM is not None and len(embedding) != EXPECTED_EMBED_DIM:
         logger.warning(
             f"Embedding dimension mismatch: expected {EXPECTED_EMBED_DIM}, got {len(embedding)}"
         )
+
+
+async def embed(text: str) -> np.ndarray:
+    """Generate embedding for text as a read-only float32 vector."""
+    text = _prepare_embed_input(text)
+    
+    embedding = await _embed_cached(OPENAI_EMBED_MODEL, text)
+    _check_embed_dim(embedding)
     
     return embedding
 
 
-def semantic_extractor(text: str) -> Dict[str, str]:
+def embed_batch(texts: List[str]) -> List[List[float]]:
+    """Generate embeddings for many texts (used by the indexer).
+    
+    Cached vectors come from the persistent cache; only the misses are
+    sent to OpenAI, batched, and written back.
+    """
+    texts = [_prepare_embed_input(t) for t in texts]
+    hashes = [embed_cache.text_hash(t) for t in texts]
+    
+    cached = embed_cache.get_many(hashes, OPENAI_EMBED_MODEL)
+    vectors = {h: vec.tolist() for h, vec in cached.items()}
+    missing = [i for i, h in enumerate(hashes) if h not in vectors]
+    
+    if missing:
+        # Boilerplate repeated across PDFs (footers, "about" blocks) is
+        # embedded once. Only exact repeats are grouped: the cache is keyed
+        # by exact-text hash and shared with query-time embed()
+        groups: Dict[str, List[int]] = {}
+        for i in missing:
+            groups.setdefault(hashes[i], []).append(i)
+        unique = [idxs[0] for idxs in groups.values()]
+
+        logger.info(
+            f"Embedding {len(unique)} of {len(texts)} texts "
+            f"({len(texts) - len(missing)} cached, {len(missing) - len(unique)} duplicates)"
+        )
+        fresh = _openai_embed_batch([texts[i] for i in unique])
+        fresh_items = list(zip(groups, fresh))
+        embed_cache.put_many(fresh_items, OPENAI_EMBED_MODEL)
+        vectors.update(fresh_items)
+    
+    embeddings = [vectors[h] for h in hashes]
+    for emb in embeddings:
+        _check_embed_dim(emb)
+    
+    return embeddings
+
+
+async def warm_embeddings(texts: List[str]) -> int:
+    """Pre-embed common queries concurrently so the first requests hit the cache."""
+    results = await asyncio.gather(*(embed(t) for t in texts), return_exceptions=True)
+
+    warmed = 0
+    for text, res in zip(texts, results):
+        if isinstance(res, Exception):
+            logger.warning(f"Embedding warm-up failed for '{text[:30]}': {res}")  # type: ignore[index]
+        else:
+            warmed += 1
+    return warmed
+
+
+SEMANTIC_KEYS = ("problem", "solution", "product", "value_proposition")
+
+
+async def semantic_extractor(text: str) -> Dict[str, str]:
     """Extract structured startup sections from unstructured text."""
     messages = [
         {
@@ -190,19 +588,19 @@ def semantic_extractor(text: str) -> Dict[str, str]:
     ]
     
     try:
-        response = _openai_chat_with_retry(
+        # JSON mode guarantees a parseable object, so no regex fallback
+        response = await _openai_chat_with_retry(
             model=OPENAI_CHAT_MODEL,
             messages=messages,
             temperature=0.0,
             max_tokens=500,
+            response_format={"type": "json_object"},
         )
-        import json
-        return json.loads(response)
+        data = json.loads(response)
     except Exception as e:
-        logger.warning(f"Semantic extraction failed: {e}")
-        return {
-            "problem": "",
-            "solution": "",
-            "product": "",
-            "value_proposition": ""
-        }
\ No newline at end of file
+        logger.warning("Semantic extraction failed: %s", e)
+        data = {}
+    
+    if not isinstance(data, dict):
+        data = {}
+    return {key: str(data.get(key) or "") for key in SEMANTIC_KEYS}
\ No newline at end of file
@@ -0,0 +1,10 @@
+from pypdf import PdfReader
+
+# Kept free of backend imports: process-pool workers import only this
+# module (and pypdf) when they start.
+
+
+def extract_text(path: str) -> str:
+    """Extract the text of every page, newline-separated."""
+    reader = PdfReader(path)
+    return "\n".join(page.extract_text() or "" for page in reader.pages)
@@ -1,9 +1,15 @@
 import os
+import re
+import asyncio
+import json
 import hashlib
 import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import chromadb
-from pypdf import PdfReader
-from typing import List, Dict
+import numpy as np
+from typing import Any, AsyncIterator, Iterator, List, Dict, Optional, Tuple
 
 from backend.config import (
     DOCS_DIR,
@@ -11,15 +17,65 @@ from backend.config import (
     MIN_SIM,
     SECTION_HEADERS,
     MAX_CONTEXT_TOKENS,
+    RAG_IN_MEMORY,
+    RAG_INCLUDE_SECTION,
 )
+from backend import ann_index, pdf_text, rag_cache, semantic_cache
 from backend.router import default_router
-from backend.dispatchers import dispatch_en, dispatch_de, dispatch_ar
-from backend.llm import embed, rag_chat, count_tokens
+from backend.dispatchers import (
+    dispatch_en,
+    dispatch_de,
+    dispatch_ar,
+    dispatch_stream_en,
+    dispatch_stream_de,
+    dispatch_stream_ar,
+)
+from backend.llm import embed, embed_batch, rag_chat, count_tokens
 
 logger = logging.getLogger(__name__)
 
 CARDS_PDF_NAME = "cards.pdf"
 INDEX_HASH_FILE = ".index_hash"
+PITCH_CACHE_FILE = "pitch_cache.json"
+
+DOCS_COLLECTION = "startup_docs"
+CARDS_COLLECTION = "cards_docs"
+
+_chroma_client = None
+_collections: Dict[str, Any] = {}
+# Collections are opened from worker threads (asyncio.to_thread), so
+# first use is serialized to create each handle exactly once
+_chroma_lock = threading.Lock()
+
+# (index key, pitch) for the last generated auto pitch
+_pitch_cache: Optional[Tuple[str, str]] = None
+
+
+def get_chroma_client():
+    """Get or create the Chroma PersistentClient singleton."""
+    global _chroma_client
+    if _chroma_client is None:
+        with _chroma_lock:
+            if _chroma_client is None:
+                os.makedirs(CHROMA_DIR, exist_ok=True)
+                _chroma_client = chromadb.PersistentClient(path=CHROMA_DIR)
+    return _chroma_client
+
+
+def get_collection(name: str):
+    """Get a cached collection handle on the shared client."""
+    col = _collections.get(name)
+    if col is None:
+        client = get_chroma_client()
+        with _chroma_lock:
+            col = _collections.get(name)
+            if col is None:
+                col = client.get_or_create_collection(
+                    name=name,
+                    metadata={"hnsw:space": "cosine"}
+                )
+                _collections[name] = col
+    return col
 
 
 # ===============================
@@ -30,7 +86,7 @@ def _compute_docs_hash() -> str:
     if not os.path.exists(DOCS_DIR):
         return ""
     
-    hasher = hashlib.md5()
+    hasher = hashlib.blake2b(digest_size=16)
     for fname in sorted(os.listdir(DOCS_DIR)):
         if fname.lower().endswith(".pdf"):
             path = os.path.join(DOCS_DIR, fname)
@@ -56,9 +112,71 @@ def _store_hash(hash_val: str):
         f.write(hash_val)
 
 
+def _file_key(fname: str, path: str) -> str:
+    """Cheap per-file identity from name, size and mtime (no parsing)."""
+    stat = os.stat(path)
+    raw = f"{fname}:{stat.st_size}:{int(stat.st_mtime)}"
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+def _extract_texts(paths: List[str]) -> Iterator[Tuple[int, str]]:
+    """Extract PDF text, yielding (index, text) as each file finishes.
+
+    pypdf decoding is CPU-bound pure Python, so threads would serialize
+    on the GIL; several files fan out to worker processes instead. They
+    are spawned rather than forked because the parent already runs
+    Chroma and HTTP client threads. Results arrive in completion order,
+    so the caller can split and write one file while others still parse.
+    """
+    if len(paths) <= 1:
+        for i, p in enumerate(paths):
+            yield i, pdf_text.extract_text(p)
+        return
+
+    workers = min(len(paths), os.cpu_count() or 1)
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as pool:
+        futures = {pool.submit(pdf_text.extract_text, p): i for i, p in enumerate(paths)}
+        for fut in as_completed(futures):
+            yield futures[fut], fut.result()
+
+
+def _scan_index(col, current: Dict[str, str]) -> Tuple[set, List[str]]:
+    """Split stored chunks into fully indexed files and stale chunk ids.
+
+    `current` maps each PDF in DOCS_DIR to its file key. A file counts as
+    indexed once a chunk of its current version carries the "complete"
+    marker, which is written with the file's last chunk. Chunks of other
+    versions, of removed files, or without a source are stale.
+    """
+    data = col.get(include=["metadatas"])
+    ids = data["ids"]
+    metas = data["metadatas"] or [None] * len(ids)
+
+    indexed = set()
+    stale = []
+    for chunk_id, meta in zip(ids, metas):
+        meta = meta or {}
+        source = meta.get("source")
+        if source in current and meta.get("file_key") == current[source]:
+            if meta.get("complete"):
+                indexed.add(source)
+        else:
+            stale.append(chunk_id)
+
+    return indexed, stale
+
+
 # ===============================
 # Index / Vector DB
 # ===============================
+# Chunks per Chroma write; keeps each SQLite transaction and HNSW insert
+# well below Chroma's max batch size
+CHROMA_WRITE_BATCH = 200
+
+
 def ensure_index():
     """Ensure vector index is up to date. Only rebuilds if documents changed."""
     os.makedirs(DOCS_DIR, exist_ok=True)
@@ -78,144 +196,238 @@ def ensure_index():
     current_hash = _compute_docs_hash()
     stored_hash = _get_stored_hash()
     
-    client = chromadb.PersistentClient(path=CHROMA_DIR)
-    col = client.get_or_create_collection(
-        name="startup_docs",
-        metadata={"hnsw:space": "cosine"}
-    )
-    cards_col = client.get_or_create_collection(
-        name="cards_docs",
-        metadata={"hnsw:space": "cosine"}
-    )
+    col = get_collection(DOCS_COLLECTION)
+    cards_col = get_collection(CARDS_COLLECTION)
     
     # Skip if hash matches and collection is not empty
     if current_hash == stored_hash and col.count() > 0:
         logger.info(f"Index is up to date (hash: {current_hash[:8]}...), skipping rebuild")  # type: ignore[index]
+        _load_search_indexes(col, build_ann=not ann_index.available())
         return
     
     logger.info(f"Building index (hash changed: {stored_hash[:8] if stored_hash else 'none'}... -> {current_hash[:8]}...)")  # type: ignore[index]
     
-    existing = set(col.get(include=[])["ids"])
-
+    files = []
     for fname in os.listdir(DOCS_DIR):
         logger.info(f"Processing file: {fname}")
-        is_cards_pdf = fname.lower() == CARDS_PDF_NAME
         if not fname.lower().endswith(".pdf"):
             continue
-
         path = os.path.join(DOCS_DIR, fname)
-        reader = PdfReader(path)
-        full_text = "\n".join(page.extract_text() or "" for page in reader.pages)
-        logger.info(f"Extracted text length: {len(full_text)}")
+        files.append((fname, path, _file_key(fname, path)))
+    current = {fname: file_key for fname, _, file_key in files}
+
+    # Chunks of changed, removed or partly indexed files are deleted only
+    # after the new versions are stored, so a failed rebuild keeps the old
+    # ones searchable
+    indexed_files = set()
+    stale_by_col = []
+    for c in (col, cards_col):
+        indexed, stale = _scan_index(c, current)
+        indexed_files |= indexed
+        stale_by_col.append((c, stale))
+    written = {col.name: set(), cards_col.name: set()}
+
+    # Chunks from all new documents, embedded and added in one pass
+    new_ids, new_texts, new_metas = [], [], []
+
+    # Only files without a complete, current set of chunks are parsed
+    pending = []
+    for fname, path, file_key in files:
+        if fname in indexed_files:
+            logger.info(f"Already indexed, skipping parse: {fname}")
+            continue
+        pending.append((fname, path, file_key))
 
-        doc_id = hashlib.md5((fname + full_text).encode()).hexdigest()
+    for idx, full_text in _extract_texts([path for _, path, _ in pending]):
+        fname, path, file_key = pending[idx]
+        is_cards_pdf = fname.lower() == CARDS_PDF_NAME
+        logger.info(f"Extracted text length for {fname}: {len(full_text)}")
 
-        if doc_id in existing:
-            continue
+        # Chunk ids are unique per file version
+        doc_id = file_key
 
         if is_cards_pdf:
-            sections = split_cards_sections(full_text)
-            for title, text in sections:
-                if not text.strip():
-                    continue
-                emb = embed(text)
+            sections = [
+                (title, text) for title, text in split_cards_sections(full_text)
+                if text.strip()
+            ]
+            if sections:
+                card_ids = [f"card_{title.lower()}" for title, _ in sections]
+                card_metas = [
+                    {"section": title.lower(), "source": fname, "file_key": file_key}
+                    for title, _ in sections
+                ]
+                card_metas[-1]["complete"] = True
                 cards_col.upsert(
-                    ids=[f"card_{title.lower()}"],
-                    documents=[text.strip()],
-                    embeddings=[emb],
-                    metadatas=[{"section": title.lower()}]
+                    ids=card_ids,
+                    documents=[text.strip() for _, text in sections],
+                    embeddings=embed_batch([text for _, text in sections]),
+                    metadatas=card_metas
                 )
+                written[cards_col.name].update(card_ids)
             continue
 
-        sections = split_sections(full_text)
-
-        for i, (title, text) in enumerate(sections):
-            if not text.strip():
-                continue
-            emb = embed(text)
-            col.add(
-                ids=[f"{doc_id}_{i}"],
-                documents=[text],
-                embeddings=[emb],
-                metadatas=[{"section": title}]
+        first = len(new_ids)
+        for i, (title, text) in enumerate(split_sections(full_text)):
+            if text.strip():
+                new_ids.append(f"{doc_id}_{i}")
+                new_texts.append(text)
+                new_metas.append({"section": title, "source": fname, "file_key": file_key})
+
+        # Batches are written in order, so the file's last chunk lands
+        # after all the others; its marker means the file is complete
+        if len(new_ids) > first:
+            new_metas[-1]["complete"] = True
+
+    if new_ids:
+        new_embs = embed_batch(new_texts)
+        for start in range(0, len(new_ids), CHROMA_WRITE_BATCH):
+            stop = start + CHROMA_WRITE_BATCH
+            col.upsert(
+                ids=new_ids[start:stop],
+                documents=new_texts[start:stop],
+                embeddings=new_embs[start:stop],
+                metadatas=new_metas[start:stop]
             )
+        written[col.name].update(new_ids)
+
+    # Card ids are reused across versions, so ids just rewritten stay
+    for c, stale in stale_by_col:
+        stale = [chunk_id for chunk_id in stale if chunk_id not in written[c.name]]
+        for start in range(0, len(stale), CHROMA_WRITE_BATCH):
+            c.delete(ids=stale[start:start + CHROMA_WRITE_BATCH])
+        if stale:
+            logger.info(f"Removed {len(stale)} stale chunks from {c.name}")
     
     # Store the hash after successful indexing
     _store_hash(current_hash)
     logger.info(f"Chroma collection count after indexing: {col.count()}")
 
+    rag_cache.invalidate()
+    semantic_cache.clear()
+    _load_search_indexes(col, build_ann=True)
+
+
+def _load_search_indexes(col, build_ann: bool):
+    """Rebuild the ANN index and/or warm the in-memory cache.
+
+    Both need every stored embedding, so they share a single col.get
+    instead of each pulling the full matrix out of Chroma.
+    """
+    if not build_ann and not RAG_IN_MEMORY:
+        return
+
+    try:
+        data = col.get(include=["embeddings", "documents", "metadatas"])
+    except Exception as e:
+        logger.warning(f"Failed to load embeddings from Chroma: {e}")
+        return
+
+    if build_ann:
+        try:
+            ann_index.build_index(
+                data["ids"], data["embeddings"], data["documents"], data["metadatas"]
+            )
+        except Exception as e:
+            logger.warning(f"ANN index build failed, retrieval will query Chroma: {e}")
+
+    if RAG_IN_MEMORY:
+        try:
+            rag_cache.warm_from(data)
+        except Exception as e:
+            logger.warning(f"In-memory cache warm-up failed, will load on first query: {e}")
+
 
 # ===============================
 # Section parsing
 # ===============================
 
 # Chunking configuration
-CHUNK_SIZE = 500      # Characters per chunk (good for embedding context window)
-CHUNK_OVERLAP = 100   # Overlap to preserve semantic continuity
+CHUNK_SIZE = 500          # Max characters per chunk (good for embedding context window)
+CHUNK_OVERLAP = 1         # Trailing sentences repeated at the start of the next chunk
+
+# Lowercased headers for O(1) per-line membership checks
+HEADER_SET = frozenset(h.lower() for h in SECTION_HEADERS)
+
+# A line consisting only of a section header (any case, surrounding spaces)
+_HEADER_RE = re.compile(
+    r"^[^\S\n]*(?:" + "|".join(re.escape(h) for h in SECTION_HEADERS) + r")[^\S\n]*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+# Sentence/paragraph boundaries; chunks only end on these (or on hard splits)
+_BOUNDARY_RE = re.compile(r"\. |\.\n|! |\?\n|\n\n")
+
+
+def _split_sentences(text: str, max_len: int) -> List[str]:
+    """Split text after each boundary; pieces longer than max_len are hard-split."""
+    pieces = []
+    start = 0
+    for m in _BOUNDARY_RE.finditer(text):
+        pieces.append(text[start:m.end()])
+        start = m.end()
+    if start < len(text):
+        pieces.append(text[start:])
+
+    return [
+        piece[i:i + max_len]
+        for piece in pieces
+        for i in range(0, len(piece), max_len)
+    ]
 
 
 def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[str]:
     """
-    Split text into overlapping chunks of specified size.
-    
-    For a ~1800 char document with chunk_size=500, overlap=100:
-    - Chunk 1: chars 0-500
-    - Chunk 2: chars 400-900 (100 char overlap)
-    - Chunk 3: chars 800-1300
-    - Chunk 4: chars 1200-1700
-    - Chunk 5: chars 1600-1800
-    = ~5 chunks (good for n_results=4)
+    Split text into chunks of whole sentences.
+
+    Sentences are packed greedily until the next one would exceed
+    chunk_size characters; each new chunk starts with the last `overlap`
+    sentences of the previous one (when they still fit).
     """
     if len(text) <= chunk_size:
         return [text] if text.strip() else []
-    
+
     chunks = []
-    start = 0
-    while start < len(text):
-        end = start + chunk_size
-        chunk = text[start:end]
-        
-        # Try to break at sentence boundary if not at end
-        if end < len(text):
-            # Look for sentence endings in last 20% of chunk
-            break_zone = chunk[int(chunk_size * 0.8):]
-            for sep in ['. ', '.\n', '! ', '?\n', '\n\n']:
-                if sep in break_zone:
-                    break_idx = chunk.rfind(sep) + len(sep)
-                    chunk = chunk[:break_idx]
-                    end = start + break_idx
-                    break
-        
-        if chunk.strip():
-            chunks.append(chunk.strip())
-        
-        start = end - overlap
-    
-    return chunks
+    current: List[str] = []
+    length = 0
+    for sentence in _split_sentences(text, chunk_size):
+        if current and length + len(sentence) > chunk_size:
+            chunks.append("".join(current).strip())
+
+            carry = current[-overlap:] if overlap > 0 else []
+            while carry and sum(map(len, carry)) + len(sentence) > chunk_size:
+                carry = carry[1:]
+            current = list(carry)
+            length = sum(map(len, current))
+
+        current.append(sentence)
+        length += len(sentence)
+
+    if current:
+        chunks.append("".join(current).strip())
+
+    return [c for c in chunks if c]
 
 
 def split_sections(text: str):
     """Split text by section headers, with chunking fallback."""
     sections = []
-    current = None
-    buffer = []
-
-    for line in text.splitlines():
-        l = line.strip().lower()
-        if l in SECTION_HEADERS:
-            if current is not None and buffer:
-                sections.append((current, "\n".join(buffer)))
-            current = line.strip()
-            buffer = []
-        else:
-            buffer.append(line)  # type: ignore[arg-type]
 
-    if current is not None and buffer:
-        sections.append((current, "\n".join(buffer)))
+    # Header lines are located by one regex pass; bodies are the slices
+    # between consecutive headers (without the newlines around them)
+    matches = list(_HEADER_RE.finditer(text))
+    for m, nxt in zip(matches, matches[1:] + [None]):
+        body = text[m.end():nxt.start() if nxt else len(text)]
+        if body in ("", "\n"):
+            continue
+        body = body[1:]
+        if body.endswith("\n"):
+            body = body[:-1]
+        sections.append((m.group(0).strip(), body))
 
-    # If no section headers found, use character-based chunking
+    # If no section headers found, fall back to sentence-based chunking
     if not sections:
-        logger.info(f"No section headers found, using character-based chunking (size={CHUNK_SIZE}, overlap={CHUNK_OVERLAP})")
+        logger.info(f"No section headers found, using sentence-based chunking (size={CHUNK_SIZE}, overlap={CHUNK_OVERLAP} sentences)")
         chunks = chunk_text(text)
         logger.info(f"Created {len(chunks)} chunks from document")
         return [(f"chunk_{i}", chunk) for i, chunk in enumerate(chunks)]
@@ -238,16 +450,14 @@ def split_cards_sections(text: str):
     sections = {}
     current = None
 
-    normalized_headers = {h.lower(): h.lower() for h in SECTION_HEADERS}
-
     for line in text.splitlines():
         line = line.strip()
         if not line:
             continue
 
         lower = line.lower()
-        if lower in normalized_headers:
-            current = normalized_headers[lower]
+        if lower in HEADER_SET:
+            current = lower
             sections[current] = []
         elif current:
             sections[current].append(line)  # type: ignore[union-attr]
@@ -262,26 +472,71 @@ def split_cards_sections(text: str):
 # ===============================
 # Auto Pitch
 # ===============================
-def auto_pitch():
-    """Generate a clean startup narrative using all indexed knowledge."""
-    client = chromadb.PersistentClient(path=CHROMA_DIR)
-    col = client.get_or_create_collection(
-        name="startup_docs",
-        metadata={"hnsw:space": "cosine"}
-    )
-
+def _load_pitch_cache() -> Optional[Tuple[str, str]]:
+    """Read the persisted pitch written by a previous process."""
+    path = os.path.join(CHROMA_DIR, PITCH_CACHE_FILE)
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+        return data["key"], data["pitch"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _store_pitch_cache(key: str, pitch: str):
+    """Persist the pitch atomically alongside the index."""
+    path = os.path.join(CHROMA_DIR, PITCH_CACHE_FILE)
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump({"key": key, "pitch": pitch}, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Failed to persist pitch cache: {e}")
+
+
+def _pitch_key(col) -> str:
+    """Cache key for the pitch: index hash plus chunk count."""
+    return f"{_get_stored_hash()}:{col.count()}"
+
+
+def _pitch_context(col) -> str:
+    """All indexed documents, truncated to the context token limit."""
     docs = col.get(include=["documents"])
-    documents = docs.get("documents", [])
-    if not documents:
-        return "No startup knowledge indexed yet."
-    
-    # Truncate context to token limit
-    full_context = ""
+    documents = docs.get("documents") or []
+
+    # Count each document once against a running total
+    parts = []
+    total_tokens = 0
+    sep_tokens = count_tokens("\n\n")
     for doc in documents:
-        if count_tokens(full_context + "\n\n" + doc) > MAX_CONTEXT_TOKENS:
+        doc_tokens = count_tokens(doc) + sep_tokens
+        if total_tokens + doc_tokens > MAX_CONTEXT_TOKENS:
             break
-        full_context += "\n\n" + doc
-    full_context = full_context.strip()
+        parts.append(doc)
+        total_tokens += doc_tokens
+    return "\n\n".join(parts).strip()
+
+
+async def auto_pitch():
+    """Generate a clean startup narrative using all indexed knowledge.
+
+    The pitch depends only on the indexed documents, so it is cached
+    (in memory and in CHROMA_DIR) until the index hash or chunk count
+    changes. File and Chroma I/O run off the event loop.
+    """
+    global _pitch_cache
+    col = get_collection(DOCS_COLLECTION)
+
+    key = await asyncio.to_thread(_pitch_key, col)
+    if _pitch_cache is None:
+        _pitch_cache = await asyncio.to_thread(_load_pitch_cache)
+    if _pitch_cache is not None and _pitch_cache[0] == key:
+        return _pitch_cache[1]
+
+    full_context = await asyncio.to_thread(_pitch_context, col)
+    if not full_context:
+        return "No startup knowledge indexed yet."
 
     prompt = (
         "Using the following information, write a concise and compelling startup pitch. "
@@ -293,135 +548,245 @@ def auto_pitch():
         {"role": "system", "content": "You are a professional startup pitch generator."},
         {"role": "user", "content": prompt},
     ]
-    return rag_chat(messages)
+    pitch = await rag_chat(messages)
+
+    _pitch_cache = (key, pitch)
+    await asyncio.to_thread(_store_pitch_cache, key, pitch)
+    return pitch
 
 
 # ===============================
 # Retrieval
 # ===============================
-def retrieve_context(question: str) -> str:
+def _search(col, q_emb: np.ndarray, n_results: int):
+    """Nearest chunks via the in-memory cache, the ANN index, or Chroma."""
+    results = None
+    if RAG_IN_MEMORY:
+        rag_cache.ensure_cache_warm(col)
+        results = rag_cache.search(q_emb, n_results)
+    if results is None:
+        results = ann_index.search(q_emb, n_results)
+    if results is None:
+        include = ["documents", "distances"]
+        if RAG_INCLUDE_SECTION:
+            include.append("metadatas")
+        results = col.query(
+            query_embeddings=[q_emb.tolist()],  # Chroma 0.4 validates plain lists
+            n_results=n_results,
+            include=include
+        )
+    return results
+
+
+# Largest cosine distance that still meets MIN_SIM
+MAX_DISTANCE = 1.0 - MIN_SIM
+
+
+async def retrieve_context(question: str) -> str:
     """Retrieve relevant context from vector database."""
-    client = chromadb.PersistentClient(path=CHROMA_DIR)
-    col = client.get_or_create_collection(
-        name="startup_docs",
-        metadata={"hnsw:space": "cosine"}
+    col = get_collection(DOCS_COLLECTION)
+
+    # Count and query embedding are independent; overlap the Chroma call
+    # with the embeddings request
+    collection_size, q_emb = await asyncio.gather(
+        asyncio.to_thread(col.count),
+        embed(question),
     )
 
     # Dynamic n_results to avoid "requested results > elements" error
-    collection_size = col.count()
-    n_results = min(4, collection_size) if collection_size > 0 else 1
+    n_results = min(3, collection_size) if collection_size > 0 else 1
     
     if collection_size == 0:
         logger.warning("No documents in collection, cannot retrieve context")
         return ""
 
-    q_emb = embed(question)
+    # Near-identical questions reuse the context assembled last time
+    cached = semantic_cache.contexts.lookup("", q_emb)
+    if cached is not None:
+        return cached
 
-    results = col.query(
-        query_embeddings=[q_emb],
-        n_results=n_results,
-        include=["documents", "distances", "metadatas"]
-    )
+    # Blocking vector search runs off the event loop
+    results = await asyncio.to_thread(_search, col, q_emb, n_results)
 
     context_blocks: list[str] = []
     total_tokens: int = 0
 
-    for doc, dist, meta in zip(
-        results["documents"][0],
-        results["distances"][0],
-        results["metadatas"][0],
-    ):
-        sim = 1 - dist  # type: ignore[operator]
-        if sim >= MIN_SIM:
-            header = meta.get("section", "").upper()  # type: ignore[union-attr]
+    documents = results["documents"][0]
+    metadatas = (results.get("metadatas") or [None])[0] or [None] * len(documents)
+
+    # Cosine distance = 1 - similarity, so filter on distance directly
+    hits = [
+        (doc, meta)
+        for doc, dist, meta in zip(documents, results["distances"][0], metadatas)
+        if dist <= MAX_DISTANCE
+    ]
+
+    for doc, meta in hits:
+        if RAG_INCLUDE_SECTION:
+            header = (meta or {}).get("section", "").upper()
             block = f"[{header}]\n{doc}"
-            block_tokens = count_tokens(block)
-            
-            # Stop if we exceed token budget
-            if total_tokens + block_tokens > MAX_CONTEXT_TOKENS:  # type: ignore[operator]
-                break
-                
-            context_blocks.append(block)
-            total_tokens += block_tokens  # type: ignore[operator]
+        else:
+            block = doc
+        block_tokens = count_tokens(block)
+
+        # Stop if we exceed token budget
+        if total_tokens + block_tokens > MAX_CONTEXT_TOKENS:  # type: ignore[operator]
+            break
+
+        context_blocks.append(block)
+        total_tokens += block_tokens  # type: ignore[operator]
 
-    return "\n\n".join(context_blocks)
+    context = "\n\n".join(context_blocks)
+    semantic_cache.contexts.store("", q_emb, context)
+    return context
 
 
 # ===============================
 # Cards (kept for UI)
 # ===============================
-def get_quick_info_cards():
-    """Get quick info cards from the cards collection."""
-    logger.info("Running Quick Info Cards")
-    client = chromadb.PersistentClient(path=CHROMA_DIR)
-    col = client.get_or_create_collection(
-        name="cards_docs",
-        metadata={"hnsw:space": "cosine"}
+# (header, card id) pairs, normalized once at import
+CARD_IDS = tuple((h, f"card_{h.lower()}") for h in SECTION_HEADERS)
+
+
+def _fetch_cards(col) -> List[Dict[str, str]]:
+    """Fetch every section card in one lookup, in SECTION_HEADERS order."""
+    res = col.get(
+        ids=[card_id for _, card_id in CARD_IDS],
+        include=["documents"]
     )
 
-    cards = []
+    # Missing ids are simply absent and order is not guaranteed, so map by id
+    docs = dict(zip(res.get("ids") or [], res.get("documents") or []))
+
+    return [
+        {"title": h.title(), "content": docs[card_id]}
+        for h, card_id in CARD_IDS
+        if docs.get(card_id)
+    ]
 
-    for h in SECTION_HEADERS:
-        key = h.lower()
-        res = col.get(
-            ids=[f"card_{key}"],
-            include=["documents"]
-        )
 
-        if res.get("documents") and res["documents"]:
-            cards.append({
-                "title": h.title(),
-                "content": res["documents"][0]
-            })
+async def get_quick_info_cards():
+    """Get quick info cards from the cards collection."""
+    logger.info("Running Quick Info Cards")
+    col = get_collection(CARDS_COLLECTION)
 
-    return cards
+    try:
+        return await asyncio.to_thread(_fetch_cards, col)
+    except Exception as e:
+        logger.warning("Card lookup failed: %s", e)
+        return []
 
 
 # ===============================
 # Orchestration
 # ===============================
+# Exact (lowercased) questions answered with the auto-generated pitch
+PITCH_TRIGGERS = frozenset({
+    "bu startup'ı anlat",
+    "describe the startup",
+    "pitch the startup",
+    "what is this startup",
+})
+
+
 def _sanitize_history(history):
     """Remove system messages from history."""
     return [m for m in history if m.get("role") != "system"]
 
 
-def answer(question: str, history: List[Dict[str, str]]):
-    """Generate answer to user question."""
+async def _route_answer(
+    question: str,
+    history: List[Dict[str, str]],
+    route: Optional[Dict] = None,
+) -> Dict:
+    """Shared routing for answer() and answer_stream().
+
+    Returns {"response": ...} when the question is fully handled here, or
+    {"lang", "history", "context"} for the language dispatcher. A route
+    already computed by the caller is reused instead of routing again.
+    """
     if not question or not isinstance(question, str):
         raise ValueError("question must be a non-empty string")
 
     history = _sanitize_history(history)
-    route = default_router(question, history) or {}
+    if route is None:
+        route = default_router(question, history) or {}
+    lang = route.get("lang", "en")
+
+    # Handle special pitch requests
+    if question.lower().strip() in PITCH_TRIGGERS:
+        return {"response": await auto_pitch()}
 
-    context = retrieve_context(question)
+    if route.get("handled"):
+        return {"response": route["response"]}
+
+    # First-turn answers depend only on the question, so near-duplicates
+    # can reuse an earlier response (embed() is LRU-cached, so this is
+    # the same vector retrieval uses)
+    if not history:
+        cached = semantic_cache.answers.lookup(lang, await embed(question))
+        if cached is not None:
+            return {"response": cached}
+
+    context = await retrieve_context(question)
     
     # Log context availability for debugging (don't block on empty)
     if context.strip():
-        logger.info(f"Retrieved context length: {len(context)} chars")
+        logger.info("Retrieved context length: %d chars", len(context))
     else:
         logger.info("No matching context found, LLM will respond based on general knowledge")
 
-    # Handle special pitch requests
-    if question.lower().strip() in [
-        "bu startup'ı anlat",
-        "describe the startup",
-        "pitch the startup",
-        "what is this startup"
-    ]:
-        return auto_pitch()
+    # Pass context to dispatcher - it handles None/empty gracefully
+    # The LLM will decide if it has enough information based on the system prompt
+    return {
+        "lang": lang,
+        "history": history,
+        "context": context if context.strip() else None,
+    }
 
-    if route.get("handled"):
-        return route["response"]
+
+async def _remember_answer(question: str, routed: Dict, response: str):
+    """Store first-turn answers in the semantic cache."""
+    if not routed["history"]:
+        semantic_cache.answers.store(routed["lang"], await embed(question), response)
+
+
+async def answer(question: str, history: List[Dict[str, str]], route: Optional[Dict] = None):
+    """Generate answer to user question."""
+    routed = await _route_answer(question, history, route)
+    if "response" in routed:
+        return routed["response"]
 
     dispatch_map = {
         "en": dispatch_en,
         "de": dispatch_de,
         "ar": dispatch_ar,
     }
+    dispatcher = dispatch_map.get(routed["lang"], dispatch_en)
+    response = await dispatcher(question, routed["history"], routed["context"])
+    await _remember_answer(question, routed, response)
+    return response
+
+
+async def answer_stream(
+    question: str,
+    history: List[Dict[str, str]],
+    route: Optional[Dict] = None,
+) -> AsyncIterator[str]:
+    """Generate answer to user question as a stream of text chunks."""
+    routed = await _route_answer(question, history, route)
+    if "response" in routed:
+        yield routed["response"]
+        return
 
-    lang = route.get("lang", "en")
-    dispatcher = dispatch_map.get(lang, dispatch_en)
-    
-    # Pass context to dispatcher - it handles None/empty gracefully
-    # The LLM will decide if it has enough information based on the system prompt
-    return dispatcher(question, history, context if context.strip() else None)
\ No newline at end of file
+    dispatch_map = {
+        "en": dispatch_stream_en,
+        "de": dispatch_stream_de,
+        "ar": dispatch_stream_ar,
+    }
+    dispatcher = dispatch_map.get(routed["lang"], dispatch_stream_en)
+    parts = []
+    async for token in dispatcher(question, routed["history"], routed["context"]):
+        parts.append(token)
+        yield token
+    await _remember_answer(question, routed, "".join(parts))
\ No newline at end of file
@@ -0,0 +1,175 @@
+import logging
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from backend.config import RAG_MMR_LAMBDA, RAG_MMR_CANDIDATES, RAG_INT8
+
+logger = logging.getLogger(__name__)
+
+# In-memory mirror of the startup_docs collection. Rows of _EMB are
+# L2-normalized at warm time so cosine similarity is a single matmul.
+_EMB: Optional[np.ndarray] = None
+# Per-row dequantization scales when _EMB holds int8 rows (RAG_INT8)
+_SCALES: Optional[np.ndarray] = None
+_TEXTS: List[str] = []
+_IDS: List[str] = []
+_METAS: List[Dict] = []
+_lock = threading.Lock()
+
+
+def as_unit_rows(vectors) -> np.ndarray:
+    """Stack vectors into a C-contiguous float32 matrix with L2-normalized rows.
+
+    float32 halves memory and bandwidth versus float64 and lets the matmul
+    dispatch to SGEMM/SGEMV.
+    """
+    m = np.array(vectors, dtype=np.float32, order="C", ndmin=2)
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    m /= norms
+    return m
+
+
+def quantize_rows(m: np.ndarray):
+    """Symmetric per-row int8 quantization: row ~= q * scale."""
+    scales = np.abs(m).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    q = np.rint(m / scales[:, None]).astype(np.int8)
+    return q, scales.astype(np.float32)
+
+
+# Rows dequantized per step when scoring int8 rows, bounding the float32 temp
+_SCORE_BLOCK = 4096
+
+
+def _scores(emb: np.ndarray, scales: Optional[np.ndarray], q: np.ndarray) -> np.ndarray:
+    """Cosine similarity of every row with the unit query vector."""
+    if scales is None:
+        return emb @ q
+
+    # NumPy has no int8 GEMV, so dequantize block-wise and use SGEMV
+    out = np.empty(emb.shape[0], dtype=np.float32)
+    for start in range(0, emb.shape[0], _SCORE_BLOCK):
+        block = emb[start:start + _SCORE_BLOCK]
+        out[start:start + block.shape[0]] = block.astype(np.float32) @ q
+    out *= scales
+    return out
+
+
+def _rows(emb: np.ndarray, scales: Optional[np.ndarray], idx: np.ndarray) -> np.ndarray:
+    """Float32 rows for the given indices."""
+    if scales is None:
+        return emb[idx]
+    return emb[idx].astype(np.float32) * scales[idx, None]
+
+
+def ensure_cache_warm(col):
+    """Load all chunk embeddings from Chroma into memory (once)."""
+    if _EMB is not None:
+        return
+
+    with _lock:
+        if _EMB is not None:
+            return
+
+        _load_locked(col.get(include=["embeddings", "documents", "metadatas"]))
+
+
+def warm_from(data: Dict):
+    """Load the cache from an already fetched ``col.get`` result."""
+    with _lock:
+        _load_locked(data)
+
+
+def _load_locked(data: Dict):
+    global _EMB, _SCALES, _TEXTS, _IDS, _METAS
+    if not data["ids"]:
+        return
+
+    emb = as_unit_rows(data["embeddings"])
+    scales = None
+    if RAG_INT8:
+        emb, scales = quantize_rows(emb)
+
+    _TEXTS, _IDS, _METAS = data["documents"], data["ids"], data["metadatas"]
+    _EMB, _SCALES = emb, scales
+    logger.info(f"In-memory retrieval cache warmed with {len(_IDS)} chunks")
+
+
+def invalidate():
+    """Drop the cached matrix so the next search reloads from Chroma."""
+    global _EMB, _SCALES, _TEXTS, _IDS, _METAS
+    with _lock:
+        _EMB, _SCALES, _TEXTS, _IDS, _METAS = None, None, [], [], []
+
+
+def search(q_vec: Sequence[float], k: int) -> Optional[Dict[str, List[List]]]:
+    """Top-k cosine search, returning results shaped like ``col.query`` output."""
+    with _lock:
+        emb, scales, texts, metas = _EMB, _SCALES, _TEXTS, _METAS
+    if emb is None or len(q_vec) != emb.shape[1]:
+        return None
+
+    q = as_unit_rows(q_vec)[0]
+    sims = _scores(emb, scales, q)
+
+    use_mmr = RAG_MMR_LAMBDA < 1.0
+    idx = top_k_indices(sims, max(k, RAG_MMR_CANDIDATES) if use_mmr else k)
+
+    if use_mmr:
+        picked = mmr_select(_rows(emb, scales, idx), q, k, RAG_MMR_LAMBDA)
+        idx = idx[picked]
+
+    return {
+        "documents": [[texts[i] for i in idx]],
+        "distances": [[float(1.0 - sims[i]) for i in idx]],
+        "metadatas": [[metas[i] for i in idx]],
+    }
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first.
+
+    argpartition selects the top k in O(N) and only those k are sorted,
+    so raising k (or N) does not pay for a full sort. Partitioning at
+    N - k avoids allocating a negated copy of the score vector.
+    """
+    n = scores.shape[0]
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    idx = np.argpartition(scores, n - k)[n - k:] if k < n else np.arange(n)
+    return idx[np.argsort(scores[idx])[::-1]]
+
+
+def mmr_select(cands: np.ndarray, q: np.ndarray, k: int, lam: float) -> List[int]:
+    """Maximal marginal relevance over L2-normalized candidate rows.
+
+    Query and pairwise similarities are computed once up front; each
+    selection step is a vectorized update of the running max similarity
+    to the already selected set.
+    """
+    D = np.ascontiguousarray(cands, dtype=np.float32)
+    sim_q = D @ q
+    sim_dd = D @ D.T
+
+    n = D.shape[0]
+    k = min(k, n)
+    selected_mask = np.zeros(n, dtype=bool)
+
+    first = int(np.argmax(sim_q))
+    selected = [first]
+    selected_mask[first] = True
+    redundancy = sim_dd[:, first].copy()
+
+    while len(selected) < k:
+        score = lam * sim_q - (1.0 - lam) * redundancy
+        score = np.where(selected_mask, -np.inf, score)
+        i = int(np.argmax(score))
+        selected.append(i)
+        selected_mask[i] = True
+        np.maximum(redundancy, sim_dd[:, i], out=redundancy)
+
+    return selected
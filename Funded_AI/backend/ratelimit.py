@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Iterable, Tuple
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+_PERIODS = {
+    "second": 1,
+    "minute": 60,
+    "hour": 3600,
+    "day": 86400,
+}
+
+# Drop idle buckets once this many clients are tracked
+MAX_BUCKETS = 10000
+
+
+def parse_rate_limit(limit: str) -> Tuple[int, float]:
+    """Parse a "15/minute" style limit into (capacity, tokens per second)."""
+    try:
+        count, period = limit.strip().lower().split("/", 1)
+        capacity = int(count)
+        seconds = _PERIODS[period.strip().rstrip("s")]
+    except (ValueError, KeyError):
+        raise ValueError(f"Invalid rate limit: {limit!r} (expected e.g. '15/minute')")
+    return capacity, capacity / seconds
+
+
+class TokenBucketMiddleware:
+    """Per-client token-bucket rate limiting at the ASGI layer.
+
+    Over-limit requests get a 429 before routing, so the request body is
+    never read or validated.
+    """
+
+    def __init__(self, app: ASGIApp, rate_limit: str, paths: Iterable[str]):
+        self.app = app
+        self.rate_limit = rate_limit
+        self.capacity, self.refill_rate = parse_rate_limit(rate_limit)
+        self.paths = frozenset(paths)
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = asyncio.Lock()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] == "OPTIONS"
+            or scope["path"] not in self.paths
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        client = scope.get("client")
+        key = client[0] if client else "127.0.0.1"
+
+        if not await self._take(key):
+            logger.warning("Rate limit exceeded for %s on %s", key, scope["path"])
+            response = JSONResponse(
+                {"error": f"Rate limit exceeded: {self.rate_limit}"},
+                status_code=429,
+                headers={"Retry-After": str(max(1, int(1 / self.refill_rate)))},
+            )
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
+
+    async def _take(self, key: str) -> bool:
+        """Refill the client's bucket and consume one token if available."""
+        now = time.monotonic()
+        async with self._lock:
+            tokens, last_ts = self._buckets.get(key, (float(self.capacity), now))
+            tokens = min(self.capacity, tokens + (now - last_ts) * self.refill_rate)
+
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+
+            if len(self._buckets) > MAX_BUCKETS:
+                self._prune(now)
+
+        return allowed
+
+    def _prune(self, now: float):
+        """Forget clients whose buckets have fully refilled."""
+        full_after = self.capacity / self.refill_rate
+        self._buckets = {
+            k: v for k, v in self._buckets.items()
+            if now - v[1] < full_after
+        }
@@ -1,7 +1,9 @@
+import re
+
 from backend.config import DEFAULT_LANGUAGE, SUPPORTED_LANGUAGES
 from typing import List, Dict
 
-PITCH_KEYWORDS = [
+PITCH_KEYWORDS = (
     "pitch",
     "investor",
     "funding",
@@ -10,30 +12,88 @@ PITCH_KEYWORDS = [
     "esg",
     "how do you make money",
     "why invest",
-]
+)
 
-LIGHT_ABOUT_KEYWORDS = [
+LIGHT_ABOUT_KEYWORDS = (
     "what is this",
     "tell me about",
     "explain",
     "anlat",
     "özetle",
     "nedir",
-]
+)
+
+
+# Whole-message acknowledgements answered without an LLM call -> reply language
+THANKS_PHRASES = {
+    "thanks": "en",
+    "thank you": "en",
+    "thanks a lot": "en",
+    "thank you so much": "en",
+    "thx": "en",
+    "ok thanks": "en",
+    "ok thank you": "en",
+    "great thanks": "en",
+    "teşekkürler": "en",
+    "teşekkür ederim": "en",
+    "sağol": "en",
+    "danke": "de",
+    "danke schön": "de",
+    "danke schon": "de",
+    "vielen dank": "de",
+    "شكرا": "ar",
+    "شكرًا": "ar",
+    "شكرا جزيلا": "ar",
+}
+
+THANKS_REPLIES = {
+    "en": "You're welcome! Is there anything else you'd like to know about FundEd?",
+    "de": "Gern geschehen! Möchten Sie noch etwas über FundEd wissen?",
+    "ar": "على الرحب والسعة! هل تود معرفة المزيد عن FundEd؟",
+}
+
+
+def detect_thanks(text: str):
+    """Return the reply language if the whole message is a thank-you."""
+    if not text or not isinstance(text, str):
+        return None
+
+    t = " ".join(text.lower().replace(",", " ").split()).strip(" !.?؟")
+    return THANKS_PHRASES.get(t)
+
+
+GREETINGS = frozenset({
+    "hi", "hello", "hey",
+    "selam", "merhaba",
+    "hallo", "guten",
+    "مرحبا", "السلام"
+})
+
+# "<greeting> ..." prefixes for str.startswith
+_GREETING_PREFIXES = tuple(g + " " for g in GREETINGS)
+
+GERMAN_KEYWORDS = ("hallo", "guten", "wie")
+ARABIC_KEYWORDS = ("مرحبا", "كيف", "ما", "هل")
+
+
+def _substring_re(keywords) -> re.Pattern:
+    """One alternation matching any keyword as a plain substring."""
+    return re.compile("|".join(re.escape(k) for k in keywords))
+
+
+# Each keyword family is a single C-level scan of the lowercased text
+_GERMAN_RE = _substring_re(GERMAN_KEYWORDS)
+_ARABIC_RE = _substring_re(ARABIC_KEYWORDS)
+_PITCH_RE = _substring_re(PITCH_KEYWORDS)
+_LIGHT_ABOUT_RE = _substring_re(LIGHT_ABOUT_KEYWORDS)
 
 
 def is_greeting(text: str) -> bool:
     if not text or not isinstance(text, str):
         return False
 
-    greetings = [
-        "hi", "hello", "hey",
-        "selam", "merhaba",
-        "hallo", "guten",
-        "مرحبا", "السلام"
-    ]
     t = text.lower().strip()
-    return any(t == g or t.startswith(g + " ") for g in greetings)
+    return t in GREETINGS or t.startswith(_GREETING_PREFIXES)
 
 
 def detect_language(text: str) -> str:
@@ -42,9 +102,9 @@ def detect_language(text: str) -> str:
 
     t = text.lower()
 
-    if any(w in t for w in ["hallo", "guten", "wie"]):
+    if _GERMAN_RE.search(t):
         return "de"
-    if any(w in t for w in ["مرحبا", "كيف", "ما", "هل"]):
+    if _ARABIC_RE.search(t):
         return "ar"
 
     return DEFAULT_LANGUAGE
@@ -59,10 +119,10 @@ def detect_intent_and_depth(text: str):
     if is_greeting(t):
         return "greeting", "light", "high"
 
-    if any(k in t for k in PITCH_KEYWORDS):
+    if _PITCH_RE.search(t):
         return "about", "pitch", "high"
 
-    if any(k in t for k in LIGHT_ABOUT_KEYWORDS):
+    if _LIGHT_ABOUT_RE.search(t):
         return "about", "light", "high"
 
     return "qa", "standard", "low"
@@ -76,6 +136,16 @@ def default_router(question: str, history: List[Dict[str, str]]):
     if lang not in SUPPORTED_LANGUAGES:
         lang = DEFAULT_LANGUAGE
 
+    # Acknowledgements need no retrieval or LLM call, whatever the history
+    thanks_lang = detect_thanks(question)
+    if thanks_lang:
+        return {
+            "handled": True,
+            "lang": thanks_lang,
+            "intent": "thanks",
+            "response": THANKS_REPLIES[thanks_lang]
+        }
+
     intent, depth, confidence = detect_intent_and_depth(question)
 
     if intent == "greeting" and not history:
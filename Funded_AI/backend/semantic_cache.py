@@ -0,0 +1,102 @@
+import logging
+import threading
+import time
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from backend.config import (
+    SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_TTL,
+    SEMANTIC_CACHE_SIZE,
+    SEMANTIC_CONTEXT_THRESHOLD,
+)
+from backend.rag_cache import as_unit_rows
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticCache:
+    """Values keyed by L2-normalized query embeddings.
+
+    Each row of the matrix has a namespace (e.g. the reply language), a
+    value and an expiry time. A lookup is one matmul over all rows, which
+    at a few hundred entries is cheaper than any bucketing scheme.
+    """
+
+    def __init__(self, name: str, threshold: float, ttl: int, size: int):
+        self.name = name
+        self.threshold = threshold
+        self.ttl = ttl
+        self.size = size
+        self._emb: Optional[np.ndarray] = None
+        self._namespaces: List[str] = []
+        self._values: List[str] = []
+        self._expires: List[float] = []
+        self._lock = threading.Lock()
+
+    def _sweep(self, now: float):
+        """Drop expired entries, then the oldest ones above the size cap."""
+        keep = [i for i, exp in enumerate(self._expires) if exp > now]
+        keep = keep[-self.size:]
+        if len(keep) == len(self._expires):
+            return
+
+        self._emb = self._emb[keep] if keep else None
+        self._namespaces = [self._namespaces[i] for i in keep]
+        self._values = [self._values[i] for i in keep]
+        self._expires = [self._expires[i] for i in keep]
+
+    def lookup(self, namespace: str, q_vec: Sequence[float]) -> Optional[str]:
+        """Return the cached value for a near-identical query, if any."""
+        if self.threshold > 1.0:
+            return None
+
+        with self._lock:
+            self._sweep(time.monotonic())
+            if self._emb is None or len(q_vec) != self._emb.shape[1]:
+                return None
+
+            sims = self._emb @ as_unit_rows(q_vec)[0]
+            sims[[ns != namespace for ns in self._namespaces]] = -np.inf
+            best = int(np.argmax(sims))
+            if sims[best] < self.threshold:
+                return None
+
+            logger.info("Semantic %s cache hit (similarity %.3f)", self.name, sims[best])
+            return self._values[best]
+
+    def store(self, namespace: str, q_vec: Sequence[float], value: str):
+        """Remember the value for this query embedding."""
+        if self.threshold > 1.0 or value is None:
+            return
+
+        row = as_unit_rows(q_vec)
+        with self._lock:
+            if self._emb is not None and self._emb.shape[1] != row.shape[1]:
+                self._clear_locked()
+            self._emb = row if self._emb is None else np.vstack([self._emb, row])
+            self._namespaces.append(namespace)
+            self._values.append(value)
+            self._expires.append(time.monotonic() + self.ttl)
+            self._sweep(time.monotonic())
+
+    def _clear_locked(self):
+        self._emb, self._namespaces, self._values, self._expires = None, [], [], []
+
+    def clear(self):
+        with self._lock:
+            self._clear_locked()
+
+
+# Final answers to first-turn questions, namespaced by reply language
+answers = SemanticCache("answer", SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_TTL, SEMANTIC_CACHE_SIZE)
+
+# Assembled retrieval context per question (stricter: skips the vector search)
+contexts = SemanticCache("context", SEMANTIC_CONTEXT_THRESHOLD, SEMANTIC_CACHE_TTL, SEMANTIC_CACHE_SIZE)
+
+
+def clear():
+    """Forget all cached answers and contexts (documents or prompts changed)."""
+    answers.clear()
+    contexts.clear()
@@ -53,7 +53,7 @@ async function send() {
             (m) => m.role === "user" || m.role === "assistant"
         );
 
-        const res = await fetch(`${API_BASE}/chat`, {
+        const res = await fetch(`${API_BASE}/chat/stream`, {
             method: "POST",
             headers: { "Content-Type": "application/json" },
             body: JSON.stringify({
@@ -62,21 +62,52 @@ async function send() {
             })
         });
 
-        if (!res.ok) {
+        if (!res.ok || !res.body) {
             throw new Error("Backend error");
         }
 
-        const data = await res.json();
+        // Read Server-Sent Events and render tokens as they arrive
+        const reader = res.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = "";
+        let reply = "";
+        let textEl = null;
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+
+            buffer += decoder.decode(value, { stream: true });
+            const events = buffer.split("\n\n");
+            buffer = events.pop();
+
+            for (const evt of events) {
+                if (!evt.startsWith("data: ")) continue;
+                const data = JSON.parse(evt.slice(6));
+
+                if (data.error) {
+                    throw new Error(data.error);
+                }
+                if (data.token) {
+                    reply += data.token;
+                    if (!textEl) {
+                        typing.remove();
+                        textEl = renderMessage("assistant", "");
+                    }
+                    setMessageText(textEl, reply);
+                    scrollBottom();
+                }
+            }
+        }
+
         typing.remove();
 
-        const reply =
-            data.response ??
-            data.answer ??
-            data.message ??
-            "Sorry, I couldn’t generate a response.";
+        if (!reply) {
+            reply = "Sorry, I couldn’t generate a response.";
+            renderMessage("assistant", reply);
+        }
 
         history.push({ role: "assistant", content: reply });
-        renderMessage("assistant", reply);
         scrollBottom();
     } catch (e) {
         typing.remove();
@@ -122,14 +153,19 @@ function renderMessage(role, text) {
     header.appendChild(avatar);
     header.appendChild(name);
 
+    const textEl = document.createElement("span");
+    setMessageText(textEl, text);
+
     bubble.appendChild(header);
-    bubble.insertAdjacentHTML(
-        "beforeend",
-        escapeHtml(text).replace(/\n/g, "<br>")
-    );
+    bubble.appendChild(textEl);
 
     row.appendChild(bubble);
     chatEl.appendChild(row);
+    return textEl;
+}
+
+function setMessageText(el, text) {
+    el.innerHTML = escapeHtml(text).replace(/\n/g, "<br>");
 }
 
 function renderTyping() {
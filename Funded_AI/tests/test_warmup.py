@@ -0,0 +1,21 @@
+import unittest
+
+from backend.app import _ROUTES
+from backend.config import WARMUP_QUESTIONS
+from backend.rag import PITCH_TRIGGERS
+from backend.router import default_router
+
+
+class WarmupQuestionsTest(unittest.TestCase):
+    def test_warmup_questions_reach_retrieval(self):
+        """Pitch-routed or handled questions never embed, so warming them is wasted."""
+        for question in WARMUP_QUESTIONS:
+            with self.subTest(question=question):
+                route = default_router(question, [])
+                self.assertFalse(route.get("handled"))
+                self.assertNotIn((route.get("intent"), route.get("depth")), _ROUTES)
+                self.assertNotIn(question.lower().strip(), PITCH_TRIGGERS)
+
+
+if __name__ == "__main__":
+    unittest.main()